@@ -3,20 +3,142 @@
 Script to search for SAM.gov opportunities matching company NAICS codes and procurement types,
 then analyze them using OpenAI to evaluate fit with company practice areas.
 """
+import asyncio
 import json
-import os
 import argparse
-from datetime import datetime, timedelta
-import time
-import pytz
+import math
+from datetime import datetime, timedelta, timezone
+try:
+    from itertools import batched
+except ImportError: # Python < 3.12
+    from itertools import islice
 
-from app.sam_client import SAMClient, SAMApiError
+    def batched(iterable, n):
+        """Yields successive n-sized tuples from iterable; the last one may be shorter."""
+        iterator = iter(iterable)
+        while batch := tuple(islice(iterator, n)):
+            yield batch
+try:
+    import orjson
+except ImportError:
+    orjson = None # type: ignore
+try:
+    import ijson
+except ImportError:
+    ijson = None # type: ignore
+try:
+    import uvloop
+except ImportError: # Not available on Windows
+    uvloop = None # type: ignore
+
+from app.sam_client import SAMClient, SAMApiError, DEFAULT_ETAG_CACHE_PATH
 from app.openai_analyzer import OpportunityAnalyzer
+from app.prefilter import top_k_opportunities
 from app.teams_notifier import TeamsNotifier
 from app.microsoft_list_poster import post_opportunities_to_list # Added for MS List posting
-from app.config import COMPANY_NAICS_CODES, PROCUREMENT_TYPES, PRACTICE_AREAS, OPENAI_API_KEY, TEAMS_WEBHOOK_URL
+from app.config import COMPANY_NAICS_CODES, PROCUREMENT_TYPES, PRACTICE_AREAS, OPENAI_API_KEY, OPENAI_USE_BATCH_API, TEAMS_WEBHOOK_URL
 
 MAX_OPPS_PER_MESSAGE = 15
+SAM_SEARCH_CONCURRENCY = 5 # Max number of SAM.gov searches in flight at once
+
+def save_json(data, path, pretty=False):
+    """
+    Write data to a JSON file, using orjson when it is installed.
+
+    Args:
+        data: The JSON-serializable data to write.
+        path: The output file path.
+        pretty: Indent the output by 2 spaces for human readers.
+    """
+    if orjson:
+        option = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if pretty else 0)
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=option))
+    else:
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2 if pretty else None)
+
+def load_json(path):
+    """Read a JSON file, using orjson when it is installed."""
+    if orjson:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def load_cached_opportunities(path):
+    """
+    Read the raw opportunities cache, streaming it with ijson when installed.
+
+    A top-level list is decoded one opportunity at a time, so the whole file never has to
+    be held in memory as text. Anything else is read with load_json.
+
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON.
+    """
+    if ijson:
+        with open(path, 'rb') as f:
+            is_list = f.read(64).lstrip().startswith(b'[')
+            f.seek(0)
+            if is_list:
+                try:
+                    # use_float keeps numbers as floats rather than Decimals, so they can be re-serialized
+                    return list(ijson.items(f, 'item', use_float=True))
+                except ijson.JSONError as e:
+                    raise json.JSONDecodeError(str(e), '', 0) from e
+    return load_json(path)
+
+async def search_naics_codes(sam_client, naics_codes, posted_from, posted_to):
+    """
+    Search SAM.gov for each NAICS code concurrently.
+
+    The blocking SAMClient calls run in worker threads, and a semaphore caps the
+    number of in-flight requests to stay polite with SAM.gov rate limits.
+
+    Returns:
+        A list of (naics_code, result) tuples in the order of naics_codes, where
+        result is either the API response or the exception raised for that code.
+    """
+    semaphore = asyncio.Semaphore(SAM_SEARCH_CONCURRENCY)
+
+    async def search_one(naics_code):
+        async with semaphore:
+            print(f"\nSearching for opportunities with NAICS code {naics_code}...")
+            return await asyncio.to_thread(
+                sam_client.search_opportunities,
+                p_type=PROCUREMENT_TYPES,
+                naics_code=naics_code,
+                posted_from=posted_from,
+                posted_to=posted_to,
+                limit=20,  # Limit per NAICS code
+                include_description=False  # Descriptions are fetched after deduplication and prefiltering
+            )
+
+    results = await asyncio.gather(*(search_one(code) for code in naics_codes), return_exceptions=True)
+    return list(zip(naics_codes, results))
+
+async def analyze_and_close(analyzer, opportunities):
+    """
+    Analyze opportunities to JSON, then close the analyzer's OpenAI connections.
+
+    The OpenAI client is bound to the event loop of asyncio.run, so it is closed
+    inside that loop rather than after it has ended.
+    """
+    try:
+        return await analyzer.analyze_opportunities_async(opportunities, output_format='json')
+    finally:
+        await analyzer.aclose()
+
+def prefilter_opportunities(opportunities, top_k):
+    """
+    Keep only the top_k opportunities by cheap practice-area keyword score.
+
+    Returns the opportunities unchanged when top_k is not set or not exceeded.
+    """
+    if not top_k or len(opportunities) <= top_k:
+        return opportunities
+    print(f"\nPrefiltering {len(opportunities)} opportunities to the top {top_k} by practice-area keyword match...")
+    return top_k_opportunities(opportunities, top_k)
 
 def main():
     """
@@ -36,7 +158,25 @@ def main():
                         help='Base filename for output files (default: opportunity_analysis)')
     parser.add_argument('--post-to-list', action='store_true',
                         help='Post the analyzed opportunities to the configured Microsoft List.')
+    parser.add_argument('--batch-naics', action='store_true',
+                        help='Search all NAICS codes with a single SAM.gov request instead of one request per code.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Re-analyze every opportunity instead of reusing cached OpenAI results from previous runs.')
+    parser.add_argument('--etag-cache', action='store_true',
+                        help=f'Send conditional requests to SAM.gov and reuse unchanged search results cached in {DEFAULT_ETAG_CACHE_PATH}.')
+    parser.add_argument('--semantic-cache', action='store_true',
+                        help='Reuse OpenAI results for near-duplicate opportunities (e.g. amendments), matched by embedding similarity.')
+    parser.add_argument('--batch-api', action='store_true', default=OPENAI_USE_BATCH_API,
+                        help='Analyze with the OpenAI Batch API at half the token cost. Results can take up to 24 hours (default: OPENAI_USE_BATCH_API).')
+    parser.add_argument('--skip-analysis', action='store_true',
+                        help='Save the raw opportunities to the JSON output file and exit without the OpenAI analysis.')
+    parser.add_argument('--top-k', type=int, default=None,
+                        help='Only fetch descriptions for and analyze the K opportunities that best match the practice areas by keyword.')
     args = parser.parse_args()
+
+    # Run the concurrent SAM.gov, OpenAI and Teams calls on uvloop when it is installed
+    if uvloop:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     print("SAM.gov Opportunity Analyzer")
     print("============================")
     
@@ -47,17 +187,23 @@ def main():
 
     # Initialize the SAM client
     try:
-        sam_client = SAMClient()
+        sam_client = SAMClient(etag_cache_path=DEFAULT_ETAG_CACHE_PATH if args.etag_cache else None)
     except ValueError as e:
         print(f"Error initializing SAM client: {str(e)}")
         return
     
-    # Initialize the OpenAI analyzer
-    try:
-        analyzer = OpportunityAnalyzer(openai_api_key=OPENAI_API_KEY)
-    except ValueError as e:
-        print(f"Error initializing OpenAI analyzer: {str(e)}")
-        return
+    # Initialize the OpenAI analyzer (not needed when only the raw opportunities are wanted)
+    if not args.skip_analysis:
+        try:
+            analyzer = OpportunityAnalyzer(
+                openai_api_key=OPENAI_API_KEY,
+                use_cache=not args.no_cache,
+                use_semantic_cache=args.semantic_cache,
+                use_batch_api=args.batch_api
+            )
+        except ValueError as e:
+            print(f"Error initializing OpenAI analyzer: {str(e)}")
+            return
     
     # Set date range
     days_to_search = args.days
@@ -78,87 +224,107 @@ def main():
     
     # Collect all opportunities matching our criteria
     all_opportunities = []
-    seen_opportunity_ids = set() # To keep track of unique opportunities
 
     if args.use_cached:
         print("\nUsing cached raw opportunities from raw_opportunities.json...")
         try:
-            with open('raw_opportunities.json', 'r') as f:
-                cached_data = json.load(f)
-                # Ensure cached_data is a list of opportunities
-                if isinstance(cached_data, list):
-                    all_opportunities = cached_data
-                elif isinstance(cached_data, dict) and 'opportunities' in cached_data:
-                    # Handle if raw_opportunities.json was saved as a dict with an 'opportunities' key
-                    all_opportunities = cached_data['opportunities']
-                else:
-                    print("Error: raw_opportunities.json is not in the expected format (list of opportunities or dict with 'opportunities' key).")
-                    return
+            cached_data = load_cached_opportunities('raw_opportunities.json')
+            # Ensure cached_data is a list of opportunities
+            if isinstance(cached_data, list):
+                all_opportunities = cached_data
+            elif isinstance(cached_data, dict) and 'opportunities' in cached_data:
+                # Handle if raw_opportunities.json was saved as a dict with an 'opportunities' key
+                all_opportunities = cached_data['opportunities']
+            else:
+                print("Error: raw_opportunities.json is not in the expected format (list of opportunities or dict with 'opportunities' key).")
+                return
             print(f"Loaded {len(all_opportunities)} opportunities from raw_opportunities.json")
+            all_opportunities = prefilter_opportunities(all_opportunities, args.top_k)
         except FileNotFoundError:
             print("Error: raw_opportunities.json not found. Run the script without --use_cached first to generate it.")
             return
-        except json.JSONDecodeError:
+        except json.JSONDecodeError: # orjson.JSONDecodeError is a subclass
             print("Error: raw_opportunities.json is not a valid JSON file.")
             return
     else:
-        # Search for each NAICS code separately
-        for naics_code in COMPANY_NAICS_CODES:
-            print(f"\nSearching for opportunities with NAICS code {naics_code}...")
-            
+        naics_codes = list(dict.fromkeys(COMPANY_NAICS_CODES)) # Duplicate codes are only searched once
+
+        if args.batch_naics:
+            # Single request covering every NAICS code
+            joined_naics_codes = ", ".join(naics_codes)
+            print(f"\nSearching for opportunities with NAICS codes {joined_naics_codes} in a single request...")
             try:
-                # Search for opportunities with this NAICS code
                 result = sam_client.search_opportunities(
                     p_type=PROCUREMENT_TYPES,
-                    naics_code=naics_code,
+                    naics_code=naics_codes,
                     posted_from=posted_from,
                     posted_to=posted_to,
-                    limit=20,  # Limit per NAICS code
-                    include_description=True  # Include descriptions for analysis
+                    limit=20 * len(naics_codes),  # Same budget as the per-code searches
+                    include_description=False  # Descriptions are fetched after deduplication and prefiltering
                 )
-                time.sleep(1) # Added delay
-                
-                # Get the opportunities for this NAICS code
-                opportunities = result.get("opportunitiesData", [])
-                count = len(opportunities)
-                
-                print(f"Found {count} opportunities for NAICS code {naics_code}")
-                
-                # Ensure unique opportunities
-                current_opportunities_count = len(all_opportunities)
-                for opp in opportunities:
-                    if opp['noticeId'] not in seen_opportunity_ids:
-                        all_opportunities.append(opp)
-                        seen_opportunity_ids.add(opp['noticeId'])
-                
-                added_count = len(all_opportunities) - current_opportunities_count
-                if added_count > 0:
-                    print(f"Added {added_count} new unique opportunities for NAICS code {naics_code}.")
-
+                search_results = [(joined_naics_codes, result)]
             except SAMApiError as e:
-                print(f"Error searching for NAICS code {naics_code}: {str(e)}")
+                search_results = [(joined_naics_codes, e)]
+        else:
+            # Search all NAICS codes concurrently
+            search_results = asyncio.run(search_naics_codes(sam_client, naics_codes, posted_from, posted_to))
+
+        unique_opportunities = {} # noticeId -> opportunity, to keep opportunities unique across NAICS codes
+        for naics_code, result in search_results:
+            if isinstance(result, SAMApiError):
+                print(f"Error searching for NAICS code {naics_code}: {str(result)}")
+                continue
+            if isinstance(result, BaseException):
+                raise result
+
+            # Get the opportunities for this NAICS code
+            opportunities = result.get("opportunitiesData", [])
+            count = len(opportunities)
+            
+            print(f"Found {count} opportunities for NAICS code {naics_code}")
+            
+            # Ensure unique opportunities
+            current_opportunities_count = len(unique_opportunities)
+            unique_opportunities.update({opp['noticeId']: opp for opp in opportunities})
+            
+            added_count = len(unique_opportunities) - current_opportunities_count
+            if added_count > 0:
+                print(f"Added {added_count} new unique opportunities for NAICS code {naics_code}.")
+
+        all_opportunities = prefilter_opportunities(list(unique_opportunities.values()), args.top_k)
+
+        # Each description is a separate request, so only fetch them for the opportunities being analyzed
+        if all_opportunities:
+            print(f"\nFetching descriptions for {len(all_opportunities)} opportunities...")
+            sam_client.add_descriptions(all_opportunities)
 
     # Save raw opportunities to a file if fetched from API
     if not args.use_cached and all_opportunities:
         print(f"\nFound {len(all_opportunities)} unique opportunities across all NAICS codes")
-        with open('raw_opportunities.json', 'w') as f:
-            json.dump(all_opportunities, f, indent=4)
+        save_json(all_opportunities, 'raw_opportunities.json')
         print("Raw opportunities saved to raw_opportunities.json")
     elif not all_opportunities:
         print("\nNo opportunities found or loaded. Exiting.")
         return
 
+    if args.skip_analysis:
+        save_json(all_opportunities, output_filename_json, pretty=True)
+        print(f"\n--skip-analysis was specified. Raw opportunities saved to {output_filename_json} without OpenAI analysis.")
+        return
+
     print("\nAnalyzing opportunities with OpenAI...")
     # Always get the full JSON data first for internal use and JSON output
-    analysis_result = analyzer.analyze_opportunities(all_opportunities, output_format='json') 
+    try:
+        analysis_result = asyncio.run(analyze_and_close(analyzer, all_opportunities))
+    finally:
+        analyzer.close()
     
     if isinstance(analysis_result, dict) and "error" in analysis_result:
         print(f"Error during analysis: {analysis_result['error']}")
         return # Exit if analysis itself failed
     
     # Save JSON output - this should always happen if analysis was successful
-    with open(output_filename_json, "w") as f_json: 
-        json.dump(analysis_result, f_json, indent=2)
+    save_json(analysis_result, output_filename_json, pretty=True)
     print(f"JSON analysis saved to {output_filename_json}")
 
     # Post to Microsoft List if requested
@@ -184,10 +350,7 @@ def main():
     unranked_opportunities = analysis_result.get("unranked_opportunities", [])
     
     # Generate a single, consistent timestamp for all parts of the report and the full file
-    if pytz:
-        generated_on_timestamp = datetime.now(pytz.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
-    else:
-        generated_on_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC (pytz not available)")
+    generated_on_timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
 
     report_agent = analyzer.report_agent # Get the ReportAgent instance
 
@@ -196,56 +359,42 @@ def main():
             print("\nSending report to Microsoft Teams in parts...")
             notifier = TeamsNotifier(webhook_url=TEAMS_WEBHOOK_URL)
             report_date_str_title = datetime.now().strftime("%Y-%m-%d") # For the main title part
+            teams_title_prefix = f"SAM Opportunity Analysis - {report_date_str_title}" # Shared by every part
             
-            # Batch and send ranked opportunities
+            teams_messages = [] # (markdown_part, teams_title, description) for every part, rendered before sending
+
+            # Batch ranked opportunities
             if ranked_opportunities:
-                num_ranked_parts = (len(ranked_opportunities) + MAX_OPPS_PER_MESSAGE - 1) // MAX_OPPS_PER_MESSAGE
-                for i in range(num_ranked_parts):
-                    batch_start = i * MAX_OPPS_PER_MESSAGE
-                    batch_end = batch_start + MAX_OPPS_PER_MESSAGE
-                    current_batch_ranked = ranked_opportunities[batch_start:batch_end]
+                num_ranked_parts = math.ceil(len(ranked_opportunities) / MAX_OPPS_PER_MESSAGE)
+                for part_num, current_batch_ranked in enumerate(batched(ranked_opportunities, MAX_OPPS_PER_MESSAGE), start=1):
+                    part_info_str = f"(Ranked - Part {part_num} of {num_ranked_parts})"
+                    teams_title = f"{teams_title_prefix} {part_info_str}"
                     
-                    part_info_str = f"(Ranked - Part {i + 1} of {num_ranked_parts})"
-                    teams_title = f"SAM Opportunity Analysis - {report_date_str_title} {part_info_str}"
-                    
-                    markdown_part = report_agent.generate_markdown_report(
-                        ranked_opportunities_batch=current_batch_ranked,
-                        unranked_opportunities_batch=[],
-                        report_title_prefix="SAM.gov Opportunity Analysis",
-                        part_info=part_info_str,
-                        generated_on_timestamp=generated_on_timestamp # Use consistent timestamp
-                    )
-                    print(f"Sending {part_info_str} to Teams ({len(current_batch_ranked)} ranked opps)...")
-                    if notifier.send_message(markdown_part, title=teams_title):
-                        print(f"{part_info_str} successfully sent to Teams.")
-                    else:
-                        print(f"Failed to send {part_info_str} to Teams.")
-                    time.sleep(2) # Delay between messages
-
-            # Batch and send unranked opportunities
+                    header = report_agent.render_header("SAM.gov Opportunity Analysis", part_info_str, generated_on_timestamp)
+                    markdown_part = f"{header}\n{report_agent.render_batch(current_batch_ranked, 'ranked')}"
+                    teams_messages.append((markdown_part, teams_title, f"{part_info_str} ({len(current_batch_ranked)} ranked opps)"))
+
+            # Batch unranked opportunities
             if unranked_opportunities:
-                num_unranked_parts = (len(unranked_opportunities) + MAX_OPPS_PER_MESSAGE - 1) // MAX_OPPS_PER_MESSAGE
-                for i in range(num_unranked_parts):
-                    batch_start = i * MAX_OPPS_PER_MESSAGE
-                    batch_end = batch_start + MAX_OPPS_PER_MESSAGE
-                    current_batch_unranked = unranked_opportunities[batch_start:batch_end]
-
-                    part_info_str = f"(Unranked - Part {i + 1} of {num_unranked_parts})"
-                    teams_title = f"SAM Opportunity Analysis - {report_date_str_title} {part_info_str}"
-
-                    markdown_part = report_agent.generate_markdown_report(
-                        ranked_opportunities_batch=[],
-                        unranked_opportunities_batch=current_batch_unranked,
-                        report_title_prefix="SAM.gov Opportunity Analysis",
-                        part_info=part_info_str,
-                        generated_on_timestamp=generated_on_timestamp # Use consistent timestamp
-                    )
-                    print(f"Sending {part_info_str} to Teams ({len(current_batch_unranked)} unranked opps)...")
-                    if notifier.send_message(markdown_part, title=teams_title):
-                        print(f"{part_info_str} successfully sent to Teams.")
-                    else:
-                        print(f"Failed to send {part_info_str} to Teams.")
-                    time.sleep(2) # Delay between messages
+                num_unranked_parts = math.ceil(len(unranked_opportunities) / MAX_OPPS_PER_MESSAGE)
+                for part_num, current_batch_unranked in enumerate(batched(unranked_opportunities, MAX_OPPS_PER_MESSAGE), start=1):
+                    part_info_str = f"(Unranked - Part {part_num} of {num_unranked_parts})"
+                    teams_title = f"{teams_title_prefix} {part_info_str}"
+
+                    header = report_agent.render_header("SAM.gov Opportunity Analysis", part_info_str, generated_on_timestamp)
+                    markdown_part = f"{header}\n{report_agent.render_batch(current_batch_unranked, 'unranked')}"
+                    teams_messages.append((markdown_part, teams_title, f"{part_info_str} ({len(current_batch_unranked)} unranked opps)"))
+
+            # Send all parts in order; the notifier rate limits the posts instead of sleeping between them
+            print(f"Sending {len(teams_messages)} parts to Teams...")
+            send_results = asyncio.run(notifier.send_messages_async(
+                [(markdown_part, teams_title) for markdown_part, teams_title, _ in teams_messages]
+            ))
+            for (_, _, part_description), sent in zip(teams_messages, send_results):
+                if sent:
+                    print(f"{part_description} successfully sent to Teams.")
+                else:
+                    print(f"Failed to send {part_description} to Teams.")
         else:
             print("\n--send-to-teams was specified, but TEAMS_WEBHOOK_URL is not configured. Skipping Teams notification.")
 
@@ -264,28 +413,17 @@ def main():
         print(f"Full Markdown analysis saved to {output_filename_md}")
 
     elif args.format.lower() == "html":
-        # This section remains largely as it was, ensure it uses 'analysis_result' (the JSON data)
-        # and 'output_filename_html' correctly.
         print("\nHTML output generation...")
         if isinstance(analysis_result, dict):
-            template_path = os.path.join(os.path.dirname(__file__), "app", "templates", "opportunity_template.html")
             try:
-                with open(template_path, "r") as template_file:
-                    template_content = template_file.read()
-                
-                # This is a placeholder. Actual HTML generation might be more complex
-                # and require parsing 'analysis_result' (JSON) to populate the template.
-                html_to_insert = "<!-- HTML content generated from JSON data would be inserted here. -->"
-                # Example: html_to_insert = convert_json_to_html_for_template(analysis_result)
-
-                html_content = template_content.replace("<!-- Content will be inserted here by the OpenAI model -->", html_to_insert)
-                
+                html_content = report_agent.generate_html_report(
+                    ranked_opportunities=ranked_opportunities,
+                    unranked_opportunities=unranked_opportunities,
+                    generated_on_timestamp=generated_on_timestamp # Use consistent timestamp
+                )
                 with open(output_filename_html, "w") as f: 
                     f.write(html_content)
                 print(f"HTML analysis saved to {output_filename_html}")
-
-            except FileNotFoundError:
-                print(f"Error: HTML template not found at {template_path}")
             except Exception as e:
                 print(f"Error processing HTML output: {e}")
         else:
@@ -1,6 +1,7 @@
 """
 API endpoints for the SAM.gov API client.
 """
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 
@@ -10,15 +11,21 @@ from app.sam_client import SAMClient, SAMApiError
 router = APIRouter(prefix="/opportunities", tags=["opportunities"])
 
 
+@lru_cache(maxsize=1)
+def _shared_sam_client() -> SAMClient:
+    """Returns the process-wide SAMClient, so its connection pool is reused across requests."""
+    return SAMClient()
+
+
 def get_sam_client() -> SAMClient:
     """
     Dependency to get the SAM.gov API client.
     
     Returns:
-        An instance of the SAMClient.
+        The shared instance of the SAMClient.
     """
     try:
-        return SAMClient()
+        return _shared_sam_client()
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
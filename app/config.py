@@ -22,7 +22,9 @@ DEFAULT_OFFSET = 0
 
 # OpenAI API configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Rank opportunities through the OpenAI Batch API (half price, but can take up to 24 hours)
+OPENAI_USE_BATCH_API = os.getenv("OPENAI_USE_BATCH_API", "false").lower() in ("1", "true", "yes")
 
 # GovWin API configuration
 GOVWIN_USERNAME = os.getenv("GOVWIN_USERNAME")
@@ -50,24 +52,33 @@ PRACTICE_AREAS = {
 }
 
 # NAICS codes for company capabilities
-COMPANY_NAICS_CODES = [
-    "519190", "518210", "541430", "541490", "541511", "541512", "541519", 
-    "541611", "541618", "541690", "541990", "92119", "921190", "541715", 
-    "611430", "561110", "541990"
-]
+COMPANY_NAICS_CODES = (
+    "519190", "518210", "541430", "541490", "541511", "541512", "541519",
+    "541611", "541618", "541690", "541990", "92119", "921190", "541715",
+    "611430", "561110",
+)
 
 # Procurement types of interest
-PROCUREMENT_TYPES = ["p", "r", "o", "k"]
+PROCUREMENT_TYPES = ("p", "r", "o", "k")
 
 # Preferred agencies that should receive higher scoring weights
-PREFERRED_AGENCIES = [
+PREFERRED_AGENCIES = (
     "Department of Agriculture",
     "Department of Transportation",
     "Department of Veterans Affairs",
     "Department of Education",
     "Department of Interior",
-    "Department of Homeland Security"
-]
+    "Department of Homeland Security",
+)
+
+# Terms that indicate a poor fit when they are the main focus of an opportunity
+IRRELEVANT_TERMS = (
+    "Membership Renewal", "Medical Services", "Fire Alarm", "Trauma", "Injury", "Expert Witness",
+    "Data Entry", "Culinary", "Geospatial", "Heritage Resource", "Chemical", "Surface Power",
+    "Laptops", "Hardware", "Helpdesk", "Geophysical", "Subscription", "Network Support", "Targeting",
+    "Commercial Solutions", "Indian", "Specimen", "Sensors", "Software Licensing", "Licensing",
+    "Enterprise License", "Battlefield", "Warfighter", "Fire Suppression",
+)
 
 # Validate essential configurations
 if not OPENAI_API_KEY:
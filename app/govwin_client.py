@@ -1,10 +1,194 @@
+import asyncio
 import os
+import re
 import requests
 import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+try:
+    from itertools import batched
+except ImportError: # Python < 3.12
+    from itertools import islice
+
+    def batched(iterable, n):
+        """Yields successive n-sized tuples from iterable; the last one may be shorter."""
+        iterator = iter(iterable)
+        while batch := tuple(islice(iterator, n)):
+            yield batch
+import httpx
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Optional, Union
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+from urllib.parse import quote_plus, urlencode
+from urllib3.util.retry import Retry
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None # type: ignore
+try:
+    import ijson
+except ImportError:
+    ijson = None # type: ignore
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Load environment variables once, rather than on every client construction
+load_dotenv()
+
+# Maximum number of IDs accepted by the batch opportunities endpoint
+OPPORTUNITY_BATCH_SIZE = 10
+
+# Status codes retried with exponential backoff (honoring Retry-After when present)
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+MAX_RETRIES = 5
+RETRY_BACKOFF_FACTOR = 0.5
+
+_TOKEN_REQUEST_HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+_JSON_REQUEST_HEADERS = {'Content-Type': 'application/json'}
+
+
+class GovWinApiError(requests.exceptions.HTTPError):
+    """
+    Exception raised for an unsuccessful GovWin API response.
+
+    Attributes:
+        error_data: The decoded JSON error body, or None if the body was not JSON.
+    """
+
+    def __init__(self, message: str, response: requests.Response, error_data: Optional[Any] = None):
+        super().__init__(message, response=response)
+        self.error_data = error_data
+
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed time-to-live."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint_prefix: str) -> None:
+        """Removes every entry whose endpoint starts with endpoint_prefix."""
+        with self._lock:
+            for key in [key for key in self._entries if key[1].startswith(endpoint_prefix)]:
+                del self._entries[key]
+
+
+def _in_requested_order(opportunity_ids: List[str], opportunities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order opportunities by the IDs they were requested with. A repeated ID maps to the same
+    opportunity again; opportunities that match no requested ID are kept at the end.
+    """
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for opp in opportunities:
+        for key in (opp.get('iqOppId'), opp.get('id')):
+            if key is not None:
+                by_id.setdefault(str(key), opp)
+
+    ordered = [by_id[opportunity_id] for opportunity_id in opportunity_ids if opportunity_id in by_id]
+    matched = {id(opp) for opp in ordered}
+    ordered.extend(opp for opp in opportunities if id(opp) not in matched)
+    return ordered
+
+
+def _index_by_id(opportunities: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Key opportunities by their GovWin ID ('iqOppId', or 'id' when it is missing), keeping their order."""
+    return {str(opp.get('iqOppId') or opp.get('id')): opp for opp in opportunities}
+
+
+def _loads_json(content: bytes) -> Any:
+    """Parse a JSON response body, using orjson when it is installed."""
+    return orjson.loads(content) if orjson else json.loads(content)
+
+
+def _dumps_json(data: Any) -> bytes:
+    """Serialize a JSON request body, using orjson when it is installed."""
+    return orjson.dumps(data) if orjson else json.dumps(data).encode('utf-8')
+
+
+def _resolve_grant_type(grant_type: Optional[str], client_id: Optional[str], client_secret: Optional[str],
+                        username: Optional[str], password: Optional[str]) -> str:
+    """
+    Choose the OAuth2 grant type and check that its credentials are present.
+
+    Without an explicit grant type, the password grant is used when a username and password
+    are available and the client_credentials grant otherwise.
+    """
+    if grant_type is None:
+        grant_type = 'password' if username and password else 'client_credentials'
+
+    if grant_type == 'password':
+        if not all([client_id, client_secret, username, password]):
+            raise ValueError("Missing credentials. Please provide client_id, client_secret, username, and password.")
+    elif grant_type == 'client_credentials':
+        if not all([client_id, client_secret]):
+            raise ValueError("Missing credentials. Please provide client_id and client_secret.")
+    else:
+        raise ValueError(f"Unsupported grant type: {grant_type}")
+    return grant_type
+
+
+def _encode_token_request_bodies(client_id: str, client_secret: str, grant_type: str,
+                                 username: Optional[str], password: Optional[str]) -> Tuple[str, str]:
+    """
+    Form-encode the token request bodies once, since the credentials never change.
+
+    Returns:
+        The authentication body for the grant type, and the refresh grant body without the
+        refresh token value.
+    """
+    client_part = urlencode({'client_id': client_id, 'client_secret': client_secret})
+    if grant_type == 'password':
+        auth_body = client_part + '&' + urlencode({
+            'grant_type': 'password',
+            'username': username,
+            'password': password,
+            'scope': 'read'
+        })
+    else:
+        auth_body = client_part + '&grant_type=client_credentials&scope=read'
+    refresh_grant_prefix = client_part + '&grant_type=refresh_token&refresh_token='
+    return auth_body, refresh_grant_prefix
+
+
+def _token_lifetime(token_data: Dict[str, Any], response_headers: Optional[Dict[str, str]] = None) -> float:
+    """
+    Returns the lifetime of a token response in seconds: the smaller of 'expires_in'
+    and any Cache-Control max-age on the response.
+    """
+    lifetime = token_data['expires_in']
+    max_age = re.search(r'max-age=(\d+)', (response_headers or {}).get('Cache-Control', ''))
+    if max_age:
+        lifetime = min(lifetime, int(max_age.group(1)))
+    return lifetime
+
+
 class GovWinClient:
     """
     Client for interacting with the GovWin WSAPI.
@@ -15,7 +199,9 @@ class GovWinClient:
     TOKEN_URL = f"{BASE_URL}/oauth/token"
     
     def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None, 
-                 username: Optional[str] = None, password: Optional[str] = None):
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 max_concurrency: int = 8, refresh_skew: int = 60, cache_ttl: float = 300,
+                 background_refresh: bool = False, grant_type: Optional[str] = None):
         """
         Initialize the GovWin client with credentials.
         
@@ -24,10 +210,15 @@ class GovWinClient:
             client_secret: The client secret for OAuth2 authentication
             username: The username for authentication
             password: The password for authentication
+            max_concurrency: Maximum number of concurrent requests for batch retrievals
+            refresh_skew: Seconds before expiry at which the access token is refreshed
+            cache_ttl: Seconds for which successful GET responses are reused. 0 disables the cache.
+            background_refresh: Refresh the access token from a background thread before it expires,
+                so requests do not wait for the refresh. The thread runs until close() is called, so
+                use the client as a context manager when enabling this.
+            grant_type: 'password' or 'client_credentials'. Defaults to 'password' when a username and
+                password are available, and 'client_credentials' otherwise.
         """
-        # Load environment variables
-        load_dotenv()
-        
         # Set credentials from parameters or environment variables
         self.client_id = client_id or os.getenv("GOVWIN_CLIENT_ID")
         self.client_secret = client_secret or os.getenv("GOVWIN_CLIENT_SECRET")
@@ -35,163 +226,249 @@ class GovWinClient:
         self.password = password or os.getenv("GOVWIN_PASSWORD")
         
         # Validate credentials
-        if not all([self.client_id, self.client_secret, self.username, self.password]):
-            raise ValueError("Missing credentials. Please provide client_id, client_secret, username, and password.")
+        self.grant_type = _resolve_grant_type(grant_type, self.client_id, self.client_secret,
+                                              self.username, self.password)
+
+        self._auth_body, self._refresh_grant_prefix = _encode_token_request_bodies(
+            self.client_id, self.client_secret, self.grant_type, self.username, self.password)
         
         # Authentication state
         self.access_token = None
         self.refresh_token = None
         self.token_expires_at = 0
+        self._token_lock = threading.Lock() # Only one thread refreshes an expiring token
+        self.refresh_skew = refresh_skew
+        self.max_concurrency = max_concurrency
+        self._base_url = self.BASE_URL.rstrip('/') + '/' # Endpoints are appended to this on every request
+
+        # Opportunity data changes slowly, so repeated GETs within a run are served from memory
+        self._response_cache = _TTLCache(maxsize=2048, ttl=cache_ttl) if cache_ttl > 0 else None
+
+        # Shared session so every request reuses pooled keep-alive connections to GovWin
+        self._session = requests.Session()
+        self._session.headers.update({'Accept-Encoding': 'gzip,deflate'})
+        # Rate limiting (429) and transient server errors are retried with exponential backoff,
+        # waiting for Retry-After when GovWin sends it
+        retry = Retry(
+            total=MAX_RETRIES,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False # Return the last response so raise_for_status reports it as before
+        )
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+
+        # Request senders by HTTP method, so make_api_request does a single lookup per call
+        self._dispatch = {'GET': self._send_get, 'POST': self._send_post}
         
         # Authenticate on initialization
         self.authenticate()
+
+        self._stop_refresher = threading.Event()
+        self._refresher = None
+        if background_refresh:
+            self._refresher = threading.Thread(target=self._token_refresher, name="govwin-token-refresher",
+                                               daemon=True)
+            self._refresher.start()
     
     def authenticate(self) -> None:
         """
-        Authenticate with the GovWin WSAPI using OAuth2 password grant type.
+        Authenticate with the GovWin WSAPI using the client's OAuth2 grant type.
         Sets the access_token, refresh_token, and token_expires_at properties.
         """
-        payload = {
-            'client_id': self.client_id,
-            'client_secret': self.client_secret,
-            'grant_type': 'password',
-            'username': self.username,
-            'password': self.password,
-            'scope': 'read'
-        }
-        
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Accept-Encoding': 'gzip,deflate'
-        }
-        
         try:
-            response = requests.post(self.TOKEN_URL, data=payload, headers=headers)
+            response = self._session.post(self.TOKEN_URL, data=self._auth_body,
+                                          headers=_TOKEN_REQUEST_HEADERS)
 
             # Handle authentication errors with detailed feedback
             if response.status_code == 400:
                 error_data = response.json() if response.text else {}
                 error_type = error_data.get('error', 'unknown')
                 error_desc = error_data.get('error_description', 'No description provided')
-                print(f"Authentication failed: {response.status_code} Client Error: {response.reason} for url: {self.TOKEN_URL}")
-                print(f"Error: {error_type}")
-                print(f"Description: {error_desc}")
+                logger.error(f"Authentication failed: {response.status_code} Client Error: {response.reason} for url: {self.TOKEN_URL}")
+                logger.error(f"Error: {error_type}")
+                logger.error(f"Description: {error_desc}")
                 raise ValueError(f"GovWin authentication failed: {error_type} - {error_desc}")
 
             response.raise_for_status()
-            token_data = response.json()
+            token_data = _loads_json(response.content)
 
-            self.access_token = token_data['access_token']
-            self.refresh_token = token_data['refresh_token']
-            self.token_expires_at = time.time() + token_data['expires_in']
+            self._set_tokens(token_data, response.headers)
 
-            print("Authentication successful.")
+            logger.info("Authentication successful.")
         except ValueError:
             # Re-raise ValueError (authentication errors)
             raise
         except requests.exceptions.RequestException as e:
-            print(f"Authentication failed: {e}")
+            logger.error(f"Authentication failed: {e}")
             raise
     
+    def _set_tokens(self, token_data: Dict[str, Any], response_headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Store the tokens from a token response and set the session's Authorization header.
+
+        The token lifetime is the smaller of 'expires_in' and any Cache-Control max-age on the response.
+        """
+        self.access_token = token_data['access_token']
+        self.refresh_token = token_data.get('refresh_token') # Not issued for client_credentials
+        self.token_lifetime = _token_lifetime(token_data, response_headers)
+        self.token_expires_at = time.time() + self.token_lifetime
+        self._session.headers['Authorization'] = f"Bearer {self.access_token}"
+
+    def _token_refresher(self) -> None:
+        """
+        Refresh the access token ahead of the lazy check in ensure_valid_token, until the client is closed.
+        """
+        while True:
+            # At most half the token lifetime, so a short-lived token is not refreshed again straight away
+            lead = min(2 * self.refresh_skew, self.token_lifetime / 2)
+            delay = max(0.0, self.token_expires_at - lead - time.time())
+            if self._stop_refresher.wait(delay):
+                return
+            with self._token_lock:
+                if time.time() <= self.token_expires_at - lead:
+                    continue # Refreshed by a request in the meantime
+                try:
+                    self.refresh_auth_token()
+                except Exception as e:
+                    logger.warning(f"Background token refresh failed: {e}")
+            if time.time() > self.token_expires_at - lead and self._stop_refresher.wait(30):
+                return # Back off after a failed refresh; requests still refresh lazily
+
+    def close(self) -> None:
+        """
+        Stop the background token refresh and close the underlying HTTP session and its pooled connections.
+        """
+        self._stop_refresher.set()
+        if self._refresher is not None:
+            self._refresher.join(timeout=5)
+        self._session.close()
+
+    def __enter__(self) -> "GovWinClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
     def refresh_auth_token(self) -> None:
         """
         Refresh the access token using the refresh token.
+        Without a refresh token (as with the client_credentials grant) this authenticates again.
         """
         if not self.refresh_token:
             self.authenticate()
             return
         
-        payload = {
-            'client_id': self.client_id,
-            'client_secret': self.client_secret,
-            'grant_type': 'refresh_token',
-            'refresh_token': self.refresh_token
-        }
-        
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Accept-Encoding': 'gzip,deflate'
-        }
+        body = self._refresh_grant_prefix + quote_plus(self.refresh_token)
         
         try:
-            response = requests.post(self.TOKEN_URL, data=payload, headers=headers)
+            response = self._session.post(self.TOKEN_URL, data=body, headers=_TOKEN_REQUEST_HEADERS)
             response.raise_for_status()
-            token_data = response.json()
+            token_data = _loads_json(response.content)
             
-            self.access_token = token_data['access_token']
-            self.refresh_token = token_data['refresh_token']
-            self.token_expires_at = time.time() + token_data['expires_in']
+            self._set_tokens(token_data, response.headers)
             
-            print("Token refresh successful.")
+            logger.debug("Token refresh successful.")
         except:
             # If refresh fails, try full authentication
-            print("Token refresh failed. Attempting full authentication.")
+            logger.warning("Token refresh failed. Attempting full authentication.")
             self.authenticate()
     
     def ensure_valid_token(self) -> None:
         """
         Ensure that the access token is valid, refreshing if necessary.
+
+        With background refresh enabled this is normally just the unlocked expiry check.
         """
-        # Add a buffer of 60 seconds to avoid edge cases
-        if time.time() > (self.token_expires_at - 60):
-            self.refresh_auth_token()
+        # Refresh refresh_skew seconds early to avoid edge cases; the unlocked check keeps the common path cheap
+        if time.time() > (self.token_expires_at - self.refresh_skew):
+            with self._token_lock:
+                # Another thread may have refreshed the token while this one waited
+                if time.time() > (self.token_expires_at - self.refresh_skew):
+                    self.refresh_auth_token()
     
-    def make_api_request(self, endpoint: str, method: str = "GET", data: Dict[str, Any] = None) -> Dict[str, Any]:
+    def make_api_request(self, endpoint: str, method: str = "GET", data: Dict[str, Any] = None,
+                         _retried: bool = False) -> Dict[str, Any]:
         """
         Make an authenticated request to the GovWin WSAPI.
+
+        Rate-limited (429) and 5xx responses are retried with backoff by the session's adapter.
+        A request rejected with an invalid token is retried once after refreshing the token.
+        Successful GET responses are cached for cache_ttl seconds.
         
         Args:
             endpoint: The API endpoint to call (without the base URL)
             method: The HTTP method to use (GET, POST, etc.)
             data: Optional data to send with the request
+            _retried: Whether this call is already the retry after a token refresh
             
         Returns:
             The JSON response from the API
+
+        Raises:
+            GovWinApiError: If the API returns an error status.
         """
+        method = method.upper()
+        send = self._dispatch.get(method)
+        if send is None:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        endpoint = endpoint.lstrip('/')
+        cache_key = None
+        if self._response_cache is not None and method == "GET":
+            cache_key = ("GET", endpoint, tuple(sorted((k, str(v)) for k, v in (data or {}).items())))
+            cached_body = self._response_cache.get(cache_key)
+            if cached_body is not None:
+                # The raw body is cached and decoded per hit, so callers that modify a response don't change the cache
+                return _loads_json(cached_body)
+        elif self._response_cache is not None:
+            # A write may change anything under the same top-level resource
+            self._response_cache.invalidate(endpoint.split('/', 1)[0])
+
         self.ensure_valid_token()
         
-        url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
-        headers = {
-            'Authorization': f"Bearer {self.access_token}",
-            'Accept-Encoding': 'gzip,deflate'
-        }
+        url = self._base_url + endpoint
         
+        response = send(url, data)
+
+        # Log response status and URL for debugging
+        logger.debug("API Request: %s %s", method, url)
+        logger.debug("Status Code: %s", response.status_code)
+
+        if response.ok:
+            result = _loads_json(response.content)
+            if cache_key is not None:
+                self._response_cache.set(cache_key, response.content)
+            return result
+
+        # Read and decode the error body once, for the token check and the exception
+        body = response.content
         try:
-            if method.upper() == "GET":
-                response = requests.get(url, headers=headers, params=data)
-            elif method.upper() == "POST":
-                headers['Content-Type'] = 'application/json'
-                response = requests.post(url, headers=headers, json=data)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            # Print response status and URL for debugging
-            print(f"API Request: {method} {url}")
-            print(f"Status Code: {response.status_code}")
-            
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 401:
-                # Check if token is invalid
-                try:
-                    error_data = response.json()
-                    if error_data.get('error') == 'invalid_token':
-                        print("Token expired. Refreshing...")
-                        self.refresh_auth_token()
-                        # Retry the request
-                        return self.make_api_request(endpoint, method, data)
-                except:
-                    pass
-            
-            print(f"API request failed: {e}")
-            # Try to print response body for more details
-            try:
-                error_body = response.text
-                print(f"Error details: {error_body}")
-            except:
-                pass
-            raise
+            error_data = _loads_json(body) if body else None
+        except ValueError:
+            error_data = None
+
+        if (response.status_code == 401 and not _retried and isinstance(error_data, dict)
+                and error_data.get('error') == 'invalid_token'):
+            logger.info("Token expired. Refreshing...")
+            self.refresh_auth_token()
+            # Retry the request
+            return self.make_api_request(endpoint, method, data, _retried=True)
+
+        error = GovWinApiError(f"{response.status_code} Error: {response.reason} for url: {url}",
+                               response=response, error_data=error_data)
+        logger.error(f"API request failed: {error}")
+        logger.error(f"Error details: {body.decode('utf-8', errors='replace')}")
+        raise error
+    
+    # Authorization and Accept-Encoding headers are set on the session
+    def _send_get(self, url: str, data: Optional[Dict[str, Any]]) -> requests.Response:
+        return self._session.get(url, params=data)
+
+    def _send_post(self, url: str, data: Optional[Dict[str, Any]]) -> requests.Response:
+        body = _dumps_json(data) if data is not None else None
+        return self._session.post(url, data=body, headers=_JSON_REQUEST_HEADERS)
     
     def get_opportunity(self, opportunity_id: str) -> Dict[str, Any]:
         """
@@ -264,48 +541,161 @@ class GovWinClient:
         if isinstance(response, dict) and 'contracts' in response:
             return response['contracts']
         return []
+
+    def get_opportunities_attribute(self, opportunity_ids: List[str], attribute_name: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get an extended attribute for many opportunities, fetching them concurrently.
+
+        Args:
+            opportunity_ids: The IDs of the opportunities
+            attribute_name: The name of the attribute to retrieve
+
+        Returns:
+            The attribute data keyed by opportunity ID. IDs whose request failed are omitted.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        unique_ids = list(dict.fromkeys(opportunity_ids))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            futures = {
+                executor.submit(self.get_opportunity_attribute, opportunity_id, attribute_name): opportunity_id
+                for opportunity_id in unique_ids
+            }
+            for future in as_completed(futures):
+                opportunity_id = futures[future]
+                try:
+                    results[opportunity_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to retrieve {attribute_name} for {opportunity_id}: {e}")
+        return results
+
+    def get_opportunities_contracts(self, opportunity_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get contracts for many opportunities, fetching them concurrently.
+
+        Args:
+            opportunity_ids: The IDs of the opportunities
+
+        Returns:
+            Lists of contract data keyed by opportunity ID. IDs whose request failed are omitted.
+        """
+        responses = self.get_opportunities_attribute(opportunity_ids, "contracts")
+        return {
+            opportunity_id: response['contracts'] if isinstance(response, dict) and 'contracts' in response else []
+            for opportunity_id, response in responses.items()
+        }
     
-    def get_opportunities(self, opportunity_ids: List[str]) -> List[Dict[str, Any]]:
+    def get_opportunities(self, opportunity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve multiple opportunities by ID, indexed by ID for direct lookup.
+
+        Args:
+            opportunity_ids: A list of opportunity IDs to retrieve
+
+        Returns:
+            The opportunity data keyed by GovWin ID ('iqOppId', or 'id' when it is missing),
+            in the order the IDs were requested
+        """
+        return _index_by_id(self.get_opportunities_list(opportunity_ids))
+
+    def get_opportunities_list(self, opportunity_ids: List[str]) -> List[Dict[str, Any]]:
         """
         Retrieve multiple opportunities by ID.
         Uses the batch endpoint that allows retrieving up to 10 opportunities in a single request.
+        Each distinct ID is requested only once.
         
         Args:
             opportunity_ids: A list of opportunity IDs to retrieve
             
         Returns:
-            A list of opportunity data
+            A list of opportunity data, in the order the IDs were requested
         """
-        results = []
-        
-        # Process in batches of 10 (API limit)
-        for i in range(0, len(opportunity_ids), 10):
-            batch = opportunity_ids[i:i+10]
-            try:
-                # Join IDs with commas for the batch endpoint
-                ids_string = ",".join(batch)
-                endpoint = f"opportunities/{ids_string}"
-                batch_results = self.make_api_request(endpoint)
-                
-                # Extract opportunities from the response
-                if 'opportunities' in batch_results and isinstance(batch_results['opportunities'], list):
-                    batch_data = batch_results['opportunities']
-                    print(f"Found {len(batch_data)} opportunities in batch")
-                    results.extend(batch_data)
+        # Process distinct IDs in batches of 10 (API limit)
+        unique_ids = list(dict.fromkeys(opportunity_ids))
+        batches = list(batched(unique_ids, OPPORTUNITY_BATCH_SIZE))
+        batch_data_by_index: Dict[int, List[Dict[str, Any]]] = {}
+
+        def fetch_batch(batch: Tuple[str, ...]) -> Dict[str, Any]:
+            # Join IDs with commas for the batch endpoint
+            ids_string = ",".join(batch)
+            return self.make_api_request(f"opportunities/{ids_string}")
+
+        # Batches are independent, so fetch them concurrently over the pooled session
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency)) as executor:
+            futures = {executor.submit(fetch_batch, batch): index for index, batch in enumerate(batches)}
+            for future in as_completed(futures):
+                index = futures[future]
+                batch = batches[index]
+                try:
+                    batch_results = future.result()
                     
-                    # Print summary of retrieved opportunities
-                    for opp in batch_data:
-                        opp_id = opp.get('id') or opp.get('iqOppId', 'Unknown ID')
-                        opp_title = opp.get('title', 'Unknown Title')
-                        print(f"Retrieved: {opp_id} - {opp_title}")
-                else:
-                    print("No opportunities found in response")
-                
-            except Exception as e:
-                print(f"Failed to retrieve opportunities {', '.join(batch)}: {e}")
+                    # Extract opportunities from the response
+                    if 'opportunities' in batch_results and isinstance(batch_results['opportunities'], list):
+                        batch_data = batch_results['opportunities']
+                        batch_data_by_index[index] = batch_data
+                        
+                        # Log summary of retrieved opportunities
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"Found {len(batch_data)} opportunities in batch")
+                            for opp in batch_data:
+                                opp_id = opp.get('id') or opp.get('iqOppId', 'Unknown ID')
+                                opp_title = opp.get('title', 'Unknown Title')
+                                logger.debug(f"Retrieved: {opp_id} - {opp_title}")
+                    else:
+                        logger.warning("No opportunities found in response")
+                    
+                except Exception as e:
+                    logger.error(f"Failed to retrieve opportunities {', '.join(batch)}: {e}")
         
-        return results
+        # Return opportunities in the order their IDs were requested
+        results = []
+        for index in sorted(batch_data_by_index):
+            results.extend(batch_data_by_index[index])
+        return _in_requested_order(opportunity_ids, results)
     
+    def iter_opportunities(self, opportunity_ids: List[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Retrieve multiple opportunities by ID, yielding each one as soon as it is decoded.
+
+        Batches of 10 are requested one after another and their responses are streamed with
+        ijson when it is installed, so the first opportunities can be processed while the rest
+        of the response is still arriving. Use get_opportunities to fetch batches concurrently.
+
+        Args:
+            opportunity_ids: A list of opportunity IDs to retrieve
+
+        Yields:
+            Opportunity data, batch by batch in the order the IDs were requested
+        """
+        for batch in batched(dict.fromkeys(opportunity_ids), OPPORTUNITY_BATCH_SIZE):
+            try:
+                yield from self._stream_batch(batch)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"Failed to retrieve opportunities {', '.join(batch)}: {e}")
+
+    def _stream_batch(self, batch: Tuple[str, ...]) -> Iterator[Dict[str, Any]]:
+        """
+        Request one batch of opportunities and yield them while the response is read.
+        """
+        self.ensure_valid_token()
+        url = f"{self._base_url}opportunities/{','.join(batch)}"
+
+        with self._session.get(url, stream=True) as response:
+            logger.debug("API Request: GET %s", url)
+            logger.debug("Status Code: %s", response.status_code)
+            response.raise_for_status()
+
+            if ijson is None:
+                yield from _loads_json(response.content).get('opportunities') or []
+                return
+
+            response.raw.decode_content = True # Let urllib3 undo any gzip encoding
+            try:
+                # use_float keeps numbers as floats rather than Decimals, matching the non-streaming path
+                yield from ijson.items(response.raw, 'opportunities.item', use_float=True)
+            except ijson.JSONError as e:
+                raise ValueError(f"Invalid JSON in GovWin response: {e}") from e
+
     def search_opportunities(self, search_params: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Retrieve a list of opportunities by search parameters.
@@ -352,7 +742,262 @@ class GovWinClient:
         return self.make_api_request(endpoint, method="GET", data=params)
 
 
+class AsyncGovWinClient:
+    """
+    Asynchronous client for the GovWin WSAPI, for retrieving many opportunities concurrently.
+
+    Requests share one pooled httpx.AsyncClient and are bounded by a semaphore, so a large
+    fan-out does not need a thread per in-flight request. Use it as an async context manager:
+
+        async with AsyncGovWinClient() as client:
+            opportunities = await client.get_opportunities(opportunity_ids)
+    """
+
+    BASE_URL = GovWinClient.BASE_URL
+    TOKEN_URL = GovWinClient.TOKEN_URL
+
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 max_concurrency: int = 16, refresh_skew: int = 60, timeout: float = 60.0,
+                 grant_type: Optional[str] = None):
+        """
+        Initialize the async GovWin client with credentials.
+
+        Authentication happens on the first request, or on entering the context manager.
+
+        Args:
+            client_id: The client ID for OAuth2 authentication
+            client_secret: The client secret for OAuth2 authentication
+            username: The username for authentication
+            password: The password for authentication
+            max_concurrency: Maximum number of requests in flight at once
+            refresh_skew: Seconds before expiry at which the access token is refreshed
+            timeout: Timeout for each HTTP request, in seconds
+            grant_type: 'password' or 'client_credentials'. Defaults to 'password' when a username and
+                password are available, and 'client_credentials' otherwise.
+        """
+        # Set credentials from parameters or environment variables
+        self.client_id = client_id or os.getenv("GOVWIN_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("GOVWIN_CLIENT_SECRET")
+        self.username = username or os.getenv("GOVWIN_USERNAME")
+        self.password = password or os.getenv("GOVWIN_PASSWORD")
+
+        # Validate credentials
+        self.grant_type = _resolve_grant_type(grant_type, self.client_id, self.client_secret,
+                                              self.username, self.password)
+
+        self._auth_body, self._refresh_grant_prefix = _encode_token_request_bodies(
+            self.client_id, self.client_secret, self.grant_type, self.username, self.password)
+
+        # Authentication state
+        self.access_token = None
+        self.refresh_token = None
+        self.token_expires_at = 0
+        self.refresh_skew = refresh_skew
+        self._token_lock = asyncio.Lock() # Only one task refreshes an expiring token
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._base_url = self.BASE_URL.rstrip('/') + '/' # Endpoints are appended to this on every request
+
+        self._client = httpx.AsyncClient(
+            headers={'Accept-Encoding': 'gzip,deflate'},
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency,
+                                keepalive_expiry=60),
+            timeout=timeout
+        )
+
+    async def __aenter__(self) -> "AsyncGovWinClient":
+        await self.ensure_valid_token()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the underlying HTTP client and its pooled connections.
+        """
+        await self._client.aclose()
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request, retrying rate-limited (429) and 5xx responses with exponential backoff.
+        Waits for the server's Retry-After when it is given in seconds.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            response = await self._client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+                return response
+
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else RETRY_BACKOFF_FACTOR * (2 ** attempt)
+            await asyncio.sleep(delay)
+        return response
+
+    def _set_tokens(self, token_data: Dict[str, Any], response_headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Store the tokens from a token response and set the client's Authorization header.
+        """
+        self.access_token = token_data['access_token']
+        self.refresh_token = token_data.get('refresh_token') # Not issued for client_credentials
+        self.token_expires_at = time.time() + _token_lifetime(token_data, response_headers)
+        self._client.headers['Authorization'] = f"Bearer {self.access_token}"
+
+    async def authenticate(self) -> None:
+        """
+        Authenticate with the GovWin WSAPI using the client's OAuth2 grant type.
+        """
+        response = await self._send("POST", self.TOKEN_URL, content=self._auth_body,
+                                    headers=_TOKEN_REQUEST_HEADERS)
+        if response.status_code == 400:
+            error_data = response.json() if response.text else {}
+            error_type = error_data.get('error', 'unknown')
+            error_desc = error_data.get('error_description', 'No description provided')
+            raise ValueError(f"GovWin authentication failed: {error_type} - {error_desc}")
+
+        response.raise_for_status()
+        self._set_tokens(_loads_json(response.content), response.headers)
+
+    async def refresh_auth_token(self) -> None:
+        """
+        Refresh the access token using the refresh token, falling back to full authentication.
+        """
+        if not self.refresh_token:
+            await self.authenticate()
+            return
+
+        body = self._refresh_grant_prefix + quote_plus(self.refresh_token)
+
+        try:
+            response = await self._send("POST", self.TOKEN_URL, content=body, headers=_TOKEN_REQUEST_HEADERS)
+            response.raise_for_status()
+            self._set_tokens(_loads_json(response.content), response.headers)
+        except (httpx.HTTPError, KeyError, ValueError):
+            logger.warning("Token refresh failed. Attempting full authentication.")
+            await self.authenticate()
+
+    async def ensure_valid_token(self) -> None:
+        """
+        Ensure that the access token is valid, refreshing if necessary.
+        """
+        if time.time() > (self.token_expires_at - self.refresh_skew):
+            async with self._token_lock:
+                # Another task may have refreshed the token while this one waited
+                if time.time() > (self.token_expires_at - self.refresh_skew):
+                    await self.refresh_auth_token()
+
+    async def make_api_request(self, endpoint: str, method: str = "GET", data: Dict[str, Any] = None,
+                               _retried: bool = False) -> Dict[str, Any]:
+        """
+        Make an authenticated request to the GovWin WSAPI.
+
+        Args:
+            endpoint: The API endpoint to call (without the base URL)
+            method: The HTTP method to use (GET or POST)
+            data: Optional data to send with the request
+            _retried: Whether this call is already the retry after a token refresh
+
+        Returns:
+            The JSON response from the API
+        """
+        await self.ensure_valid_token()
+
+        url = self._base_url + endpoint.lstrip('/')
+        method = method.upper()
+        if method == "GET":
+            request_kwargs = {'params': data}
+        elif method == "POST":
+            body = _dumps_json(data) if data is not None else None
+            request_kwargs = {'content': body, 'headers': _JSON_REQUEST_HEADERS}
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        async with self._semaphore:
+            response = await self._send(method, url, **request_kwargs)
+
+        if response.status_code == 401 and not _retried:
+            try:
+                is_invalid_token = response.json().get('error') == 'invalid_token'
+            except ValueError:
+                is_invalid_token = False
+            if is_invalid_token:
+                async with self._token_lock:
+                    await self.refresh_auth_token()
+                return await self.make_api_request(endpoint, method, data, _retried=True)
+
+        response.raise_for_status()
+        return _loads_json(response.content)
+
+    async def get_opportunity(self, opportunity_id: str) -> Dict[str, Any]:
+        """
+        Retrieve a single opportunity by ID.
+
+        Args:
+            opportunity_id: The ID of the opportunity to retrieve
+
+        Returns:
+            The opportunity data
+        """
+        response = await self.make_api_request(f"opportunities/{opportunity_id}")
+        if 'opportunities' in response and isinstance(response['opportunities'], list) and len(response['opportunities']) > 0:
+            return response['opportunities'][0]
+        return response
+
+    async def get_opportunity_attribute(self, opportunity_id: str, attribute_name: str) -> Dict[str, Any]:
+        """
+        Get extended attribute information for a specific opportunity.
+
+        Args:
+            opportunity_id: The ID of the opportunity
+            attribute_name: The name of the attribute to retrieve
+
+        Returns:
+            The attribute data
+        """
+        return await self.make_api_request(f"opportunities/{opportunity_id}/{attribute_name}")
+
+    async def get_opportunities(self, opportunity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve multiple opportunities by ID, indexed by ID for direct lookup.
+
+        Args:
+            opportunity_ids: A list of opportunity IDs to retrieve
+
+        Returns:
+            The opportunity data keyed by GovWin ID ('iqOppId', or 'id' when it is missing),
+            in the order the IDs were requested
+        """
+        return _index_by_id(await self.get_opportunities_list(opportunity_ids))
+
+    async def get_opportunities_list(self, opportunity_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Retrieve multiple opportunities by ID, fetching all batches of 10 concurrently.
+        Each distinct ID is requested only once.
+
+        Args:
+            opportunity_ids: A list of opportunity IDs to retrieve
+
+        Returns:
+            A list of opportunity data, in the order the IDs were requested
+        """
+        batches = list(batched(dict.fromkeys(opportunity_ids), OPPORTUNITY_BATCH_SIZE))
+        batch_responses = await asyncio.gather(
+            *(self.make_api_request(f"opportunities/{','.join(batch)}") for batch in batches),
+            return_exceptions=True
+        )
+
+        results = []
+        for batch, batch_results in zip(batches, batch_responses):
+            if isinstance(batch_results, Exception):
+                logger.error(f"Failed to retrieve opportunities {', '.join(batch)}: {batch_results}")
+            elif 'opportunities' in batch_results and isinstance(batch_results['opportunities'], list):
+                results.extend(batch_results['opportunities'])
+            else:
+                logger.warning("No opportunities found in response")
+        return _in_requested_order(opportunity_ids, results)
+
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     try:
         # Example usage
         client = GovWinClient()
@@ -410,7 +1055,7 @@ if __name__ == "__main__":
         
         # Print a summary of all retrieved opportunities
         print(f"\nOpportunities Summary:")
-        for i, opp in enumerate(opportunities, 1):
+        for i, opp in enumerate(opportunities.values(), 1):
             opp_id = opp.get('iqOppId') or opp.get('id', 'Unknown ID')
             opp_title = opp.get('title', 'Unknown Title')
             opp_status = opp.get('status', 'Unknown Status')
@@ -0,0 +1,80 @@
+"""
+Persistent cache for OpenAI opportunity analysis results.
+
+Scoring is effectively deterministic for a given opportunity, prompt inputs and model,
+so results from previous runs can be reused instead of re-sending the opportunity to OpenAI.
+Entries are keyed by content rather than notice ID, so an opportunity republished under
+a new notice ID reuses the earlier analysis.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None # type: ignore
+
+from .config import PRACTICE_AREAS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.sam_analyzer_cache")
+DEFAULT_TTL_SECONDS = 30 * 86400 # 30 days; prompt and model changes already produce new keys
+
+
+class LLMCache:
+    """
+    On-disk cache of per-opportunity analysis results, keyed by a SHA256 of the
+    opportunity content, practice areas, prompt version and model settings.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: int = DEFAULT_TTL_SECONDS):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache files.
+            ttl: Default time-to-live for cached entries, in seconds.
+        """
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+
+        if diskcache is None:
+            logger.warning("diskcache is not installed. OpenAI analysis results will not be cached between runs.")
+            self._cache = None
+        else:
+            self._cache = diskcache.Cache(directory)
+
+    @staticmethod
+    def make_key(title: str, description: str, naics: str, model: str, temperature: float,
+                 prompt_version: str) -> str:
+        """
+        Build the cache key for an opportunity.
+
+        Any change to the opportunity content, the practice areas, the prompt version or
+        the model settings produces a different key, so stale analyses are never reused.
+        """
+        payload = json.dumps({
+            "title": title,
+            "desc": description,
+            "naics": naics,
+            "prompt": prompt_version,
+            "areas": sorted(PRACTICE_AREAS.items()),
+            "model": model,
+            "temperature": temperature,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached analysis for a key, or None on a miss."""
+        value = self._cache.get(key) if self._cache is not None else None
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """Stores an analysis result for a key."""
+        if self._cache is not None:
+            self._cache.set(key, value, expire=ttl or self.ttl)
@@ -2,24 +2,116 @@ import msal
 import requests
 import json
 import logging
+import os
 import re
-import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from . import config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None # type: ignore
+
 logger = logging.getLogger(__name__)
 
 GRAPH_API_ENDPOINT = 'https://graph.microsoft.com/v1.0'
+HTTP_POOL_SIZE = 32
+GRAPH_BATCH_SIZE = 20 # Maximum number of requests in a Graph JSON batch
+MAX_CONCURRENT_BATCHES = 8 # Must not exceed HTTP_POOL_SIZE, so every in-flight batch gets a pooled connection
+JSON_HEADERS = {'Content-Type': 'application/json'}
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+MSAL_CACHE_PATH = os.path.expanduser("~/.msal_token_cache.bin")
 
-def get_access_token():
-    """Acquires an access token from Azure AD."""
-    authority = f"https://login.microsoftonline.com/{config.MS_TENANT_ID}"
-    app = msal.ConfidentialClientApplication(
-        config.MS_CLIENT_ID,
-        authority=authority,
-        client_credential=config.MS_CLIENT_SECRET,
+# The MSAL app is created once, so its token cache is reused by every call to get_access_token
+_msal_app = None
+_msal_cache = None
+_msal_lock = threading.Lock()
+
+# SharePoint Online site URL: the hostname, and the optional server-relative path without its leading slash
+_SITE_URL_RE = re.compile(r'^https://([^/]+\.sharepoint\.com)(?:/(.*))?$')
+
+# Resolved SharePoint IDs, which do not change for a given site URL and list name
+_site_ids = {}
+_list_ids = {}
+
+def _loads_json(content):
+    """Parses a JSON response body, using orjson when it is installed."""
+    return orjson.loads(content) if orjson else json.loads(content)
+
+def _dumps_json(data):
+    """Serializes a JSON request body, using orjson when it is installed."""
+    return orjson.dumps(data) if orjson else json.dumps(data).encode('utf-8')
+
+def create_graph_session(access_token, max_retries=3, initial_retry_delay=5):
+    """
+    Creates a requests session for Microsoft Graph calls.
+
+    All calls made through the session reuse pooled keep-alive connections, and the
+    authorization headers are set once rather than on every request. Throttled (429) and
+    5xx responses are retried with exponential backoff, waiting for Graph's Retry-After
+    when it is sent.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=initial_retry_delay,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['GET', 'POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False # Return the last response so raise_for_status reports it
     )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry))
+    session.headers.update({
+        'Authorization': f'Bearer {access_token}',
+        'Accept': 'application/json'
+    })
+    return session
+
+def _get_msal_app():
+    """Returns the shared MSAL app, creating it with a token cache persisted to MSAL_CACHE_PATH."""
+    global _msal_app, _msal_cache
+    if _msal_app is None:
+        _msal_cache = msal.SerializableTokenCache()
+        if os.path.exists(MSAL_CACHE_PATH):
+            try:
+                with open(MSAL_CACHE_PATH, 'r') as f:
+                    _msal_cache.deserialize(f.read())
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not load MSAL token cache from {MSAL_CACHE_PATH}: {e}")
+
+        authority = f"https://login.microsoftonline.com/{config.MS_TENANT_ID}"
+        _msal_app = msal.ConfidentialClientApplication(
+            config.MS_CLIENT_ID,
+            authority=authority,
+            client_credential=config.MS_CLIENT_SECRET,
+            token_cache=_msal_cache,
+        )
+    return _msal_app
+
+def _save_msal_cache():
+    """Writes the MSAL token cache to MSAL_CACHE_PATH if it has changed. The file is only readable by its owner."""
+    if _msal_cache is None or not _msal_cache.has_state_changed:
+        return
+    try:
+        fd = os.open(MSAL_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(_msal_cache.serialize())
+        _msal_cache.has_state_changed = False
+    except OSError as e:
+        logger.warning(f"Could not save MSAL token cache to {MSAL_CACHE_PATH}: {e}")
 
-    result = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
+def get_access_token():
+    """Acquires an access token from Azure AD, reusing a cached token while it is valid."""
+    with _msal_lock:
+        app = _get_msal_app()
+        result = app.acquire_token_silent(GRAPH_SCOPES, account=None)
+        if not result:
+            result = app.acquire_token_for_client(scopes=GRAPH_SCOPES)
+        _save_msal_cache()
 
     if "access_token" in result:
         return result['access_token']
@@ -27,110 +119,250 @@ def get_access_token():
         logger.error(f"Failed to acquire token: {result.get('error_description')}")
         raise Exception(f"Error acquiring token: {result.get('error')}\nDescription: {result.get('error_description')}")
 
-def get_site_id(access_token, site_url):
-    """Gets the SharePoint site ID using the site URL."""
+def refresh_ids():
+    """Forgets the cached site and list IDs, so they are looked up again on next use."""
+    _site_ids.clear()
+    _list_ids.clear()
+
+def get_site_id(session, site_url):
+    """Gets the SharePoint site ID using the site URL. The ID is cached per site URL."""
+    if site_url in _site_ids:
+        return _site_ids[site_url]
+
     # Example site_url: https://yourtenant.sharepoint.com/sites/yoursite
     if not site_url.startswith('https://'):
         raise ValueError("SHAREPOINT_SITE_URL must start with https://")
     
-    try:
-        # Split URL into hostname and path part
-        # e.g., 'yourtenant.sharepoint.com' and '/sites/yoursite'
-        parts = site_url.replace('https://', '', 1).split('/', 1)
-        hostname = parts[0]
-        if not hostname.endswith('.sharepoint.com'):
-            raise ValueError("Site URL does not appear to be a valid SharePoint Online URL.")
-        
-        # The server-relative path needs a leading slash if it's not empty
-        relative_path = ""
-        if len(parts) > 1 and parts[1]:
-            relative_path = "/" + parts[1]
-        else: # Handle case like https://tenant.sharepoint.com (root site)
-            relative_path = ""
-            
-        # Construct the site identifier for Graph API: hostname:/server-relative-path
-        # For root site, it would be hostname:/
-        # For a specific site, it would be hostname:/sites/sitename
-        graph_site_identifier = f"{hostname}:{relative_path}"
-        logger.info(f"Constructed Graph API site identifier: {graph_site_identifier}")
-
-    except Exception as e:
-        logger.error(f"Error parsing SHAREPOINT_SITE_URL '{site_url}': {e}")
+    # Split URL into hostname and path part
+    # e.g., 'yourtenant.sharepoint.com' and 'sites/yoursite'
+    match = _SITE_URL_RE.match(site_url)
+    if not match:
+        logger.error(f"Error parsing SHAREPOINT_SITE_URL '{site_url}': Site URL does not appear to be a valid SharePoint Online URL.")
         raise ValueError(f"Could not parse SHAREPOINT_SITE_URL: {site_url}. Ensure it's a valid SharePoint site URL.")
+    hostname, path = match.groups()
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/json'
-    }
-    response = requests.get(f"{GRAPH_API_ENDPOINT}/sites/{graph_site_identifier}", headers=headers)
+    # The server-relative path needs a leading slash if it's not empty
+    # (it is empty for a root site like https://tenant.sharepoint.com)
+    relative_path = "/" + path if path else ""
+
+    # Construct the site identifier for Graph API: hostname:/server-relative-path
+    # For root site, it would be hostname:/
+    # For a specific site, it would be hostname:/sites/sitename
+    graph_site_identifier = f"{hostname}:{relative_path}"
+    logger.info(f"Constructed Graph API site identifier: {graph_site_identifier}")
+
+    response = session.get(f"{GRAPH_API_ENDPOINT}/sites/{graph_site_identifier}", params={"$select": "id"})
     response.raise_for_status() # Raise an exception for HTTP errors
-    return response.json().get('id')
+    site_id = _loads_json(response.content).get('id')
+    if site_id:
+        _site_ids[site_url] = site_id
+    return site_id
 
-def get_list_id(access_token, site_id, list_name):
-    """Gets the ID of a list within a SharePoint site by its display name."""
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Accept': 'application/json'
-    }
-    # Filter by display name to find the list
-    # Using f-string for query parameter encoding; ensure list_name is simple or properly encoded if complex.
-    response = requests.get(f"{GRAPH_API_ENDPOINT}/sites/{site_id}/lists?$filter=displayName eq '{list_name}'", headers=headers)
+def get_list_id(session, site_id, list_name):
+    """Gets the ID of a list within a SharePoint site by its display name. The ID is cached per site and name."""
+    if (site_id, list_name) in _list_ids:
+        return _list_ids[(site_id, list_name)]
+    # Filter by display name to find the list, fetching only the ID. Quotes in the name are doubled
+    # for OData, and requests URL-encodes the parameters.
+    odata_list_name = list_name.replace("'", "''")
+    response = session.get(
+        f"{GRAPH_API_ENDPOINT}/sites/{site_id}/lists",
+        params={"$filter": f"displayName eq '{odata_list_name}'", "$select": "id"}
+    )
     response.raise_for_status()
-    lists = response.json().get('value')
+    lists = _loads_json(response.content).get('value')
     if lists and len(lists) == 1:
+        _list_ids[(site_id, list_name)] = lists[0].get('id')
         return lists[0].get('id')
     elif not lists:
         raise Exception(f"List '{list_name}' not found on site ID '{site_id}'.")
     else:
         raise Exception(f"Multiple lists found with name '{list_name}'. Please use a unique name.")
 
-def add_item_to_list(access_token, site_id, list_id, item_data, max_retries=3, initial_retry_delay=5):
-    """Adds an item to the SharePoint list with retry logic for 5xx errors."""
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
+def get_posted_notice_ids(session, site_id, list_id):
+    """
+    Gets the NoticeIDs of the items already in the SharePoint list.
+
+    Only the NoticeID field is fetched, in pages of up to 5000 items.
+
+    Returns:
+        A set of NoticeID strings.
+    """
+    notice_ids = set()
+    url = f"{GRAPH_API_ENDPOINT}/sites/{site_id}/lists/{list_id}/items"
+    params = {"$expand": "fields($select=NoticeID)", "$select": "id", "$top": "5000"}
+    while url:
+        response = session.get(url, params=params)
+        response.raise_for_status()
+        page = _loads_json(response.content)
+        for item in page.get('value', []):
+            notice_id = (item.get('fields') or {}).get('NoticeID')
+            if notice_id:
+                notice_ids.add(notice_id)
+        url = page.get('@odata.nextLink') # Already includes the query parameters
+        params = None
+    return notice_ids
+
+def add_item_to_list(session, site_id, list_id, item_data):
+    """Adds an item to the SharePoint list. Throttling and 5xx errors are retried by the session."""
     payload = {'fields': item_data}
-    logger.info(f"DEBUG_ADD_ITEM_PAYLOAD: For NoticeID {item_data.get('NoticeID', 'N/A')}, payload being sent: {json.dumps(payload, indent=2)}") # DEBUG
-    
-    retries = 0
-    while retries <= max_retries:
-        try:
-            response = requests.post(
-                f"{GRAPH_API_ENDPOINT}/sites/{site_id}/lists/{list_id}/items",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status() # Raises HTTPError for 4xx/5xx responses
-            logger.info(f"Successfully added item to list. Item ID: {response.json().get('id')}")
-            return response.json()
-        except requests.exceptions.HTTPError as e:
-            # For 5xx errors, retry after a delay. For 4xx, raise immediately.
-            if e.response.status_code >= 500 and retries < max_retries:
-                retries += 1
-                delay = initial_retry_delay * (2 ** (retries - 1)) # Exponential backoff
-                logger.warning(f"Server error {e.response.status_code} encountered. Retrying in {delay} seconds... (Attempt {retries}/{max_retries})")
-                logger.warning(f"Failed payload for {item_data.get('NoticeID', item_data.get('Title', 'Unknown Item'))}: {json.dumps(payload)}")
-                time.sleep(delay)
-            else:
-                logger.error(f"Error adding item to list: {e.response.status_code} - {e.response.text}")
-                logger.error(f"Request payload: {json.dumps(payload)}")
-                raise # Reraise the exception if it's a 4xx or max retries reached for 5xx
-        except requests.exceptions.RequestException as e: # Catch other request exceptions like timeouts not resulting in HTTPError
-            if retries < max_retries:
-                retries += 1
-                delay = initial_retry_delay * (2 ** (retries - 1))
-                logger.warning(f"Request exception encountered: {e}. Retrying in {delay} seconds... (Attempt {retries}/{max_retries})")
-                time.sleep(delay)
-            else:
-                logger.error(f"Request exception encountered after max retries: {e}")
-                logger.error(f"Request payload: {json.dumps(payload)}")
-                raise
-    return None # Should not be reached if max_retries leads to an exception
+    logger.debug("DEBUG_ADD_ITEM_PAYLOAD: For NoticeID %s, payload being sent: %s", item_data.get('NoticeID', 'N/A'), payload)
+
+    try:
+        response = session.post(
+            f"{GRAPH_API_ENDPOINT}/sites/{site_id}/lists/{list_id}/items",
+            data=_dumps_json(payload),
+            headers=JSON_HEADERS
+        )
+        response.raise_for_status() # Raises HTTPError for 4xx/5xx responses left after retries
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 404:
+            refresh_ids() # The cached site or list ID may be stale
+        logger.error(f"Error adding item to list: {e.response.status_code} - {e.response.text}")
+        logger.error(f"Request payload: {json.dumps(payload)}")
+        raise
+    except requests.exceptions.RequestException as e: # Connection errors and timeouts left after retries
+        logger.error(f"Request exception encountered after max retries: {e}")
+        logger.error(f"Request payload: {json.dumps(payload)}")
+        raise
+
+    item = _loads_json(response.content)
+    logger.info(f"Successfully added item to list. Item ID: {item.get('id')}")
+    return item
+
+def _post_batch(session, site_id, list_id, items):
+    """
+    Adds up to GRAPH_BATCH_SIZE items to the SharePoint list with a single Graph JSON batch request.
+
+    Items whose subrequest fails with a throttling (429) or server (5xx) error are retried
+    individually through add_item_to_list. Other failures are logged and skipped.
+
+    Returns:
+        A (posted, failed) tuple of item counts.
+    """
+    batch_body = {
+        "requests": [
+            {
+                "id": str(index),
+                "method": "POST",
+                "url": f"/sites/{site_id}/lists/{list_id}/items",
+                "headers": {"Content-Type": "application/json"},
+                "body": {"fields": fields}
+            }
+            for index, fields in enumerate(items)
+        ]
+    }
+
+    try:
+        response = session.post(f"{GRAPH_API_ENDPOINT}/$batch", data=_dumps_json(batch_body), headers=JSON_HEADERS)
+        response.raise_for_status()
+        subresponses = _loads_json(response.content).get('responses', [])
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"Batch request for {len(items)} items failed: {e}. Posting them individually.")
+        subresponses = [{"id": str(index), "status": 500} for index in range(len(items))]
+
+    posted, failed = 0, 0
+    answered = set()
+    for subresponse in subresponses:
+        index = int(subresponse.get('id', -1))
+        if not 0 <= index < len(items):
+            continue
+        answered.add(index)
+        fields = items[index]
+        status = subresponse.get('status', 500)
+        notice_id = fields.get('NoticeID', fields.get('Title', 'Unknown Item'))
+
+        if status < 300:
+            posted += 1
+            logger.info(f"Successfully added {notice_id} to list. Item ID: {(subresponse.get('body') or {}).get('id')}")
+            continue
+
+        if status == 429 or status >= 500:
+            try:
+                add_item_to_list(session, site_id, list_id, fields)
+                posted += 1
+            except requests.exceptions.RequestException:
+                failed += 1 # add_item_to_list has logged the error
+            continue
+
+        failed += 1
+        if status == 404:
+            refresh_ids() # The cached site or list ID may be stale
+        logger.error(f"Error adding {notice_id} to list (batch request id {index}): {status} - {json.dumps(subresponse.get('body'))}")
+        logger.error(f"Request payload: {json.dumps({'fields': fields})}")
+
+    # Graph answers every subrequest; count anything missing as failed rather than silently dropping it
+    for index in set(range(len(items))) - answered:
+        failed += 1
+        logger.error(f"No batch response for {items[index].get('NoticeID', 'Unknown Item')}.")
+    return posted, failed
+
+def post_items_batched(session, site_id, list_id, items):
+    """
+    Adds items to the SharePoint list in Graph JSON batches of up to GRAPH_BATCH_SIZE,
+    with up to MAX_CONCURRENT_BATCHES batches in flight at once.
+
+    Items are consumed lazily: the next batch is only taken from the iterable once a
+    posting slot is free, so at most 2 * MAX_CONCURRENT_BATCHES batches are held in memory.
+
+    Args:
+        session: Graph session from create_graph_session.
+        site_id: ID of the SharePoint site.
+        list_id: ID of the SharePoint list.
+        items: Iterable of mapped list item fields, as returned by map_opportunity_to_list_item.
+
+    Returns:
+        A (posted, failed) tuple of item counts.
+    """
+    posted, failed = 0, 0
+    pending = {}
+
+    def collect(done):
+        nonlocal posted, failed
+        for future in done:
+            chunk_size = pending.pop(future)
+            try:
+                chunk_posted, chunk_failed = future.result()
+            except Exception as e:
+                logger.error(f"Unexpected error posting a batch of {chunk_size} items: {e}", exc_info=True)
+                chunk_posted, chunk_failed = 0, chunk_size
+            posted += chunk_posted
+            failed += chunk_failed
+
+    # The session and its headers are only read, so the batches can share it
+    iterator = iter(items)
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as executor:
+        while chunk := list(islice(iterator, GRAPH_BATCH_SIZE)):
+            if len(pending) >= 2 * MAX_CONCURRENT_BATCHES:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            pending[executor.submit(_post_batch, session, site_id, list_id, chunk)] = len(chunk)
+        collect(wait(pending).done)
+    return posted, failed
+
+# SAM.gov procurement type codes and their display names
+_PTYPE_MAP = {
+    'u': "Justification (J&A)",
+    'p': "Pre solicitation",
+    'a': "Award Notice",
+    'r': "Sources Sought",
+    's': "Special Notice",
+    'o': "Solicitation",
+    'g': "Sale of Surplus Property",
+    'k': "Combined Synopsis/Solicitation",
+    'i': "Intent to Bundle Requirements (DoD-Funded)"
+}
+
+# Placeholder values that mean "no value", in every capitalization of N/A
+_NA_VALUES = frozenset({'', 'N/A', 'n/a', 'N/a', 'n/A'})
+
+def _normalize_na(value):
+    """Returns None for a missing, empty or "N/A" value, and the stripped string otherwise."""
+    if value is None:
+        return None
+    text = value.strip() if isinstance(value, str) else str(value).strip()
+    return None if text in _NA_VALUES else text
 
 def map_opportunity_to_list_item(opportunity):
-    print(f"DEBUG_POSTER_ENTRY: notice_id={opportunity.get('notice_id', 'N/A')}, received opportunity['uiLink']: '{opportunity.get('uiLink')}'") # DEBUG
     """
     Maps an opportunity dictionary (from your analysis) to the format 
     required for SharePoint list item creation.
@@ -153,28 +385,23 @@ def map_opportunity_to_list_item(opportunity):
         # Add other fields as needed, ensuring keys match your SharePoint list's internal column names.
     }
     """
+    logger.debug("DEBUG_POSTER_ENTRY: notice_id=%s, received opportunity['uiLink']: '%s'",
+                 opportunity.get('notice_id', 'N/A'), opportunity.get('uiLink'))
+
     # Placeholder - replace with actual mapping
     # You'll need to know the internal names of your SharePoint list columns.
     # For example, if your SharePoint list has a column 'OpportunityTitle' for the title:
     # 'OpportunityTitle': opportunity.get('title', 'N/A'),
     
     # Prepare date fields - convert "N/A" or empty strings to None for date fields
-    posted_date_str = opportunity.get('posted_date')
-    if not posted_date_str or str(posted_date_str).strip().upper() == "N/A":
-        posted_date_val = None
-    else:
-        posted_date_val = str(posted_date_str).strip()
+    posted_date_val = _normalize_na(opportunity.get('posted_date'))
 
     raw_response_date_from_opp = opportunity.get('response_date') # Key standardized in BusinessDevelopmentAgent
-    notice_id_for_log = opportunity.get('NoticeID', opportunity.get('notice_id', 'N/A')) # Get NoticeID for logging
-    logger.info(f"[Debug ResponseDate] NoticeID: {notice_id_for_log} - Raw 'response_date' from opportunity: '{raw_response_date_from_opp}' (type: {type(raw_response_date_from_opp)})")
-
-    response_date_str = raw_response_date_from_opp # Use the already fetched value
-    if not response_date_str or str(response_date_str).strip().upper() == "N/A":
-        response_date_val = None
-    else:
-        response_date_val = str(response_date_str).strip()
-    logger.info(f"[Debug ResponseDate] NoticeID: {notice_id_for_log} - Processed 'response_date_val': '{response_date_val}' (type: {type(response_date_val)})")
+    response_date_val = _normalize_na(raw_response_date_from_opp)
+    if logger.isEnabledFor(logging.DEBUG):
+        notice_id_for_log = opportunity.get('NoticeID', opportunity.get('notice_id', 'N/A'))
+        logger.debug(f"[Debug ResponseDate] NoticeID: {notice_id_for_log} - Raw 'response_date' from opportunity: '{raw_response_date_from_opp}' (type: {type(raw_response_date_from_opp)})")
+        logger.debug(f"[Debug ResponseDate] NoticeID: {notice_id_for_log} - Processed 'response_date_val': '{response_date_val}' (type: {type(response_date_val)})")
 
     # Prepare SAMUrl field for Single line of text column type
     raw_link_data = opportunity.get('uiLink') # This is the direct URL string or 'N/A'
@@ -182,7 +409,7 @@ def map_opportunity_to_list_item(opportunity):
 
     if isinstance(raw_link_data, str):
         temp_link_string = raw_link_data.strip()
-        if temp_link_string.startswith('http://') or temp_link_string.startswith('https://'):
+        if temp_link_string.startswith(('http://', 'https://')):
             link_val = temp_link_string
         elif temp_link_string and temp_link_string != 'N/A': # It's some other non-empty, non-N/A string that's not a URL
             logger.warning(f"Invalid SAMUrl value received: '{temp_link_string}'. Expected a URL or 'N/A'. SAMUrl will be empty for NoticeID {opportunity.get('notice_id', 'UNKNOWN')}.")
@@ -190,22 +417,12 @@ def map_opportunity_to_list_item(opportunity):
     elif raw_link_data is not None: # It's not a string and not None (e.g. a number or bool by mistake)
         logger.warning(f"Unexpected data type for SAMUrl: {type(raw_link_data)} with value '{raw_link_data}'. SAMUrl will be empty for NoticeID {opportunity.get('notice_id', 'UNKNOWN')}.")
 
-    print(f"DEBUG_POSTER_LINK_VAL: notice_id={opportunity.get('notice_id', 'N/A')}, final link_val before mapping: '{link_val}' (type: {type(link_val)})") # DEBUG
+    logger.debug("DEBUG_POSTER_LINK_VAL: notice_id=%s, final link_val before mapping: '%s'",
+                 opportunity.get('notice_id', 'N/A'), link_val)
     
     # Ptype translation
     ptype_code = opportunity.get('ptype', 'N/A')
-    ptype_map = {
-        'u': "Justification (J&A)",
-        'p': "Pre solicitation",
-        'a': "Award Notice",
-        'r': "Sources Sought",
-        's': "Special Notice",
-        'o': "Solicitation",
-        'g': "Sale of Surplus Property",
-        'k': "Combined Synopsis/Solicitation",
-        'i': "Intent to Bundle Requirements (DoD-Funded)"
-    }
-    translated_ptype = ptype_map.get(ptype_code, ptype_code if ptype_code and ptype_code.strip() and ptype_code.upper() != 'N/A' else 'Unknown')
+    translated_ptype = _PTYPE_MAP.get(ptype_code, ptype_code if ptype_code and ptype_code.strip() not in _NA_VALUES else 'Unknown')
     mapped_item = {
         # --- ENSURE THESE KEYS ARE YOUR ACTUAL SHAREPOINT LIST INTERNAL COLUMN NAMES ---
         'Title': opportunity.get('title', opportunity.get('solicitation_title', 'N/A')),
@@ -226,40 +443,80 @@ def map_opportunity_to_list_item(opportunity):
     }
 
     # Debugging PracticeArea
-    practice_area_value = opportunity.get('assigned_practice_area')
-    logger.info(f"DEBUG_PRACTICE_AREA: NoticeID: {opportunity.get('notice_id', 'N/A')}, AssignedPracticeArea: '{practice_area_value}' (Type: {type(practice_area_value)}) G_PRACTICE_AREA_END")
+    logger.debug("DEBUG_PRACTICE_AREA: NoticeID: %s, AssignedPracticeArea: '%s'",
+                 opportunity.get('notice_id', 'N/A'), opportunity.get('assigned_practice_area'))
 
-    # Filter out None values to avoid issues with SharePoint list columns that don't accept nulls
-    return {k: v for k, v in mapped_item.items() if v is not None}
+    # Filter out None values to avoid issues with SharePoint list columns that don't accept nulls.
+    # Deleting in place avoids building a second dict for every item.
+    for key in [key for key, value in mapped_item.items() if value is None]:
+        del mapped_item[key]
+    return mapped_item
 
-def post_opportunities_to_list(opportunities):
-    """Posts a list of opportunities to the configured SharePoint list."""
+def _map_list_items(opportunities, posted_notice_ids):
+    """
+    Yields the mapped list item fields for each opportunity. Skips opportunities that map to
+    nothing, repeat an earlier notice ID, or whose notice ID is in posted_notice_ids.
+    """
+    seen_notice_ids = set(posted_notice_ids)
+    for opp in opportunities:
+        notice_id = opp.get('notice_id')
+        if notice_id in seen_notice_ids:
+            logger.info(f"Skipping opportunity {notice_id}: it is already in the list or was posted earlier in this run.")
+            continue
+        if notice_id:
+            seen_notice_ids.add(notice_id)
+
+        # Assuming 'opp' is a dictionary representing a single opportunity
+        # We need to map its fields to the SharePoint list column names
+        list_item_data = map_opportunity_to_list_item(opp)
+        if not list_item_data:
+            logger.warning(f"Skipping opportunity due to empty mapped data: {opp.get('notice_id', 'Unknown ID')}")
+            continue
+        yield list_item_data
+
+def post_opportunities_to_list(opportunities, skip_existing=True):
+    """
+    Posts opportunities to the configured SharePoint list. Each notice ID is posted at most once.
+
+    Args:
+        opportunities: Any iterable of opportunities, such as a list or a generator. Opportunities
+            are mapped as they are posted, so the mapped items are never all held in memory at once.
+        skip_existing: Skip opportunities whose notice ID is already in the list, so re-runs do not
+            create duplicate items.
+    """
     if not all([config.MS_TENANT_ID, config.MS_CLIENT_ID, config.MS_CLIENT_SECRET, 
                 config.SHAREPOINT_SITE_URL, config.SHAREPOINT_LIST_NAME]):
         logger.error("Microsoft Graph API credentials or SharePoint details are not fully configured. Skipping post to list.")
         return
 
+    session = None
     try:
         token = get_access_token()
-        site_id = get_site_id(token, config.SHAREPOINT_SITE_URL)
-        list_id = get_list_id(token, site_id, config.SHAREPOINT_LIST_NAME)
+        session = create_graph_session(token)
+        site_id = get_site_id(session, config.SHAREPOINT_SITE_URL)
+        list_id = get_list_id(session, site_id, config.SHAREPOINT_LIST_NAME)
 
         if not opportunities:
             logger.info("No opportunities to post to the list.")
             return
 
-        for opp in opportunities:
-            # Assuming 'opp' is a dictionary representing a single opportunity
-            # We need to map its fields to the SharePoint list column names
-            list_item_data = map_opportunity_to_list_item(opp)
-            if not list_item_data:
-                logger.warning(f"Skipping opportunity due to empty mapped data: {opp.get('notice_id', 'Unknown ID')}")
-                continue
-            
-            logger.info(f"Posting opportunity {opp.get('notice_id', 'Unknown ID')} to list '{config.SHAREPOINT_LIST_NAME}'...")
-            add_item_to_list(token, site_id, list_id, list_item_data)
-        
-        logger.info(f"Successfully posted {len(opportunities)} opportunities to the list.")
+        posted_notice_ids = set()
+        if skip_existing:
+            try:
+                posted_notice_ids = get_posted_notice_ids(session, site_id, list_id)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"Could not read the NoticeIDs already in the list, so none will be skipped: {e}")
+
+        logger.info(f"Posting opportunities to list '{config.SHAREPOINT_LIST_NAME}'...")
+        list_items = _map_list_items(opportunities, posted_notice_ids)
+        posted, failed = post_items_batched(session, site_id, list_id, list_items)
+
+        if not posted and not failed:
+            logger.info("No opportunities to post to the list.")
+        elif failed:
+            logger.warning(f"Posted {posted} opportunities to the list; {failed} could not be posted.")
+        else:
+            logger.info(f"Successfully posted {posted} opportunities to the list.")
 
     except requests.exceptions.RequestException as e:
         logger.error(f"HTTP Request error during SharePoint list operation: {e}")
@@ -267,6 +524,9 @@ def post_opportunities_to_list(opportunities):
         logger.error(f"MSAL Authentication error: {e}")
     except Exception as e:
         logger.error(f"An unexpected error occurred while posting to Microsoft List: {e}", exc_info=True)
+    finally:
+        if session is not None:
+            session.close()
 
 if __name__ == '__main__':
     # Example usage (for testing this module directly)
@@ -1,47 +1,323 @@
 """
 OpenAI integration module for analyzing SAM.gov opportunities.
 """
+import asyncio
+import hashlib
+import io
 import json
 import os
-from typing import Any, Dict, List, Tuple, Union
-from openai import OpenAI
+import re
+from collections import defaultdict
+from itertools import chain
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, TypeVar, Union
+import httpx
+from openai import AsyncOpenAI
 import logging
-from .config import OPENAI_API_KEY, PRACTICE_AREAS, PREFERRED_AGENCIES
+from .config import IRRELEVANT_TERMS, OPENAI_API_KEY, OPENAI_MODEL, OPENAI_USE_BATCH_API, PRACTICE_AREAS, PREFERRED_AGENCIES
+from .llm_cache import LLMCache
+from .prefilter import score_cheap
+from .semantic_cache import SemanticCache, EMBEDDING_MODEL
 import datetime
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
 try:
-    import pytz
+    import jinja2
 except ImportError:
-    pytz = None # type: ignore
+    jinja2 = None # type: ignore
+try:
+    import orjson
+except ImportError:
+    orjson = None # type: ignore
+try:
+    import h2 # Enables HTTP/2 in httpx
+except ImportError:
+    h2 = None # type: ignore
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None # type: ignore
 
 # Basic logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+HTML_REPORT_TEMPLATE = "opportunity_template.html"
+
+def _loads_json(content: Union[str, bytes]) -> Any:
+    """Parses JSON from OpenAI, using orjson when it is installed."""
+    return orjson.loads(content) if orjson else json.loads(content)
+
+def _dumps_json(data: Any) -> str:
+    """Serializes compact JSON for an OpenAI request, using orjson when it is installed."""
+    return orjson.dumps(data).decode("utf-8") if orjson else json.dumps(data, separators=(",", ":"))
+
+# Structured-outputs schema for a ranking response; strict mode guarantees parseable output
+# and restricts 'assigned_practice_area' to the configured practice areas
+RANKING_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "ranked_opportunities",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "ranked_opportunities": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "original_opportunity_id": {"type": "integer"},
+                            "title": {"type": "string"},
+                            "notice_id": {"type": "string"},
+                            "assigned_practice_area": {"type": "string", "enum": sorted(PRACTICE_AREAS) + ["Uncategorized"]},
+                            "fit_score": {"type": "integer"},
+                            "justification": {"type": "string"},
+                        },
+                        "required": ["original_opportunity_id", "title", "notice_id",
+                                     "assigned_practice_area", "fit_score", "justification"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["ranked_opportunities"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Invariant parts of the ranking system prompt, rendered once at import (sorted keys keep the bytes stable)
+_PRACTICE_AREAS_JSON = json.dumps(PRACTICE_AREAS, indent=2, sort_keys=True)
+_PREFERRED_AGENCIES_TEXT = ', '.join(PREFERRED_AGENCIES)
+_IRRELEVANT_TERMS_TEXT = ', '.join(IRRELEVANT_TERMS)
+
+# Matches any irrelevant term as a whole word or phrase, e.g. "Indian" but not "Indiana"
+_IRRELEVANT_TERMS_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, IRRELEVANT_TERMS)) + r")\b", re.IGNORECASE)
+
+# Compile the HTML report template once per process rather than on every report
+if jinja2:
+    _jinja_env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=False,
+        cache_size=400,
+    )
+    _html_report_template = _jinja_env.get_template(HTML_REPORT_TEMPLATE)
+else:
+    _html_report_template = None
+
 class BusinessDevelopmentAgent:
     """
     Agent responsible for analyzing opportunities, standardizing them, 
     and preparing them for ranking.
     """
-    BATCH_SIZE = 3 # Class attribute for batch size (reduced from 5 to save tokens/time)
+    BATCH_SIZE = 25 # Max opportunities per request; the system prompt is repeated in every request
+    MAX_INPUT_TOKENS = 60000 # Estimated prompt token budget per request, which can make batches smaller
+    MAX_AI_DESCRIPTION_TOKENS = 200 # Description tokens sent to the model per opportunity
+    MAX_AI_DESCRIPTION_CHARS = 800 # Character limit used instead when no tiktoken encoding is available
+    MAX_CHARS_PER_TOKEN = 10 # Only this many characters per allowed token are encoded when truncating
+    TRUNCATION_MARKER = "...[truncated]"
+    # Prepared fields sent to the model, and the key each is sent under; the rest stay local, joined back by 'id'
+    AI_PROMPT_FIELDS = (
+        ("id", "id"),
+        ("notice_id", "notice_id"),
+        ("title", "title"),
+        ("department", "department"),
+        ("naics_code", "naics"),
+        ("set_aside", "set_aside"),
+        ("description_for_ai_processing", "description"),
+    )
+    MAX_CONCURRENT_BATCHES = 8 # Default max number of batches in flight with OpenAI at once
+    MAX_CONNECTIONS = 100 # Connection pool size of the OpenAI HTTP client
+    MAX_KEEPALIVE_CONNECTIONS = 50
+    # Retries per request on rate limits, 5xx, timeouts and connection errors, with jittered exponential
+    # backoff (honouring Retry-After) done by the OpenAI SDK; 4xx errors like BadRequestError are not retried
+    MAX_RETRIES = 5
+    TEMPERATURE = 0.1
+    BATCH_API_POLL_INITIAL_DELAY = 10 # Seconds before the first Batch API status check
+    BATCH_API_POLL_MAX_DELAY = 300 # Cap on the exponential backoff between status checks
+    BATCH_API_FAILED_STATUSES = frozenset({"failed", "expired", "cancelled"})
+    BATCH_API_MAX_WAIT = 3600 # Seconds to wait for a Batch API job before cancelling it and ranking synchronously
+    # Raw SAM.gov fields kept on standardized opportunities, for the ranking preparation, the database,
+    # the Microsoft List and the reports; the standardized fields are added by _standardize_opportunity
+    PASSTHROUGH_FIELDS = (
+        "noticeId", "title", "type", "fullParentPathName", "naicsCode", "typeOfSetAside",
+        "typeOfSetAsideDescription", "setAside", "postedDate", "responseDeadLine", "description",
+    )
+    MISSING_LINK_LOG_EVERY = 100 # Log one in this many opportunities without a uiLink
+    PROMPT_CACHE_KEY_PREFIX = "bdagent" # The prompt version is appended; see prompt_version
 
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    def __init__(self, api_key: str, model: str = OPENAI_MODEL, cache: Optional[LLMCache] = None,
+                 semantic_cache: Optional[SemanticCache] = None, max_concurrency: Optional[int] = None,
+                 use_batch_api: bool = False) -> None:
         self.api_key = api_key
         self.model = model # Will be used in get_ranked_opportunities_json
+        self.cache = cache # Optional cache of analysis results from previous runs
+        self.semantic_cache = semantic_cache # Optional cache of analyses of near-duplicate opportunities
+        # Cap on concurrent OpenAI requests, to stay under the account's RPM/TPM limits
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENT_BATCHES
+        # Send all batches as one OpenAI Batch API job: half the token price, but results can take hours
+        self.use_batch_api = use_batch_api
         if not self.api_key:
             raise ValueError("OpenAI API key is required for BusinessDevelopmentAgent.")
-        # self.client will be initialized here but used in get_ranked_opportunities_json
         # Set timeout to 5 minutes (300 seconds) to prevent hanging
-        import httpx
-        self.client = OpenAI(
-            api_key=self.api_key,
-            timeout=httpx.Timeout(300.0, read=300.0, write=300.0, connect=30.0)
-        )
+        self.timeout = httpx.Timeout(300.0, read=300.0, write=300.0, connect=30.0)
+        self.limits = httpx.Limits(max_connections=self.MAX_CONNECTIONS,
+                                   max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS)
+        self._system_message = self._build_system_message()
+        # Changes whenever the system prompt or response schema does, so cached analyses made with an older
+        # prompt are never reused. Also routes ranking requests to the same OpenAI prompt cache.
+        prompt_digest = hashlib.sha256(
+            f"{self._system_message}\n{_dumps_json(RANKING_RESPONSE_FORMAT)}".encode("utf-8")
+        ).hexdigest()[:16]
+        self.prompt_version = f"{self.PROMPT_CACHE_KEY_PREFIX}-{prompt_digest}"
+        self._semantic_cache_scope = SemanticCache.make_scope(self.model, self.prompt_version)
+        self._client: Optional[AsyncOpenAI] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None # Event loop of the synchronous wrappers
+        self._missing_link_count = 0
+        self._encoding = self._load_encoding()
+
+    def _load_encoding(self) -> Optional["tiktoken.Encoding"]:
+        """Returns the tiktoken encoding of the ranking model, or None if tiktoken or its data is unavailable."""
+        if tiktoken is None:
+            return None
+        try:
+            try:
+                return tiktoken.encoding_for_model(self.model)
+            except KeyError: # Model unknown to this tiktoken version
+                return tiktoken.get_encoding("o200k_base")
+        except Exception as e: # The encoding data is downloaded on first use
+            logger.warning(f"Could not load the tiktoken encoding. Descriptions will be truncated by characters: {str(e)}")
+            return None
+
+    def _truncate_description(self, description: str) -> Tuple[str, Optional[int]]:
+        """
+        Truncates a description to what is sent to the model.
+
+        With a tiktoken encoding the cut is at MAX_AI_DESCRIPTION_TOKENS tokens, otherwise at
+        MAX_AI_DESCRIPTION_CHARS characters.
+
+        Returns:
+            A tuple of (text for the model, its token count or None if no encoding is available).
+        """
+        if self._encoding is None:
+            max_chars = self.MAX_AI_DESCRIPTION_CHARS
+            return (description[:max_chars] + self.TRUNCATION_MARKER if len(description) > max_chars else description), None
+
+        max_tokens = self.MAX_AI_DESCRIPTION_TOKENS
+        # Long descriptions only need their start encoded to find the cut
+        prefix = description[:max_tokens * self.MAX_CHARS_PER_TOKEN]
+        token_ids = self._encoding.encode(prefix, disallowed_special=())
+        if len(token_ids) <= max_tokens and len(prefix) == len(description):
+            return description, len(token_ids)
+        truncated = self._encoding.decode(token_ids[:max_tokens]) + self.TRUNCATION_MARKER
+        return truncated, min(len(token_ids), max_tokens) + len(self._encoding.encode(self.TRUNCATION_MARKER))
+
+    def _build_system_message(self) -> str:
+        """
+        Builds the ranking system prompt.
+
+        It holds no per-batch content and is built once per agent, so every request starts with the
+        same bytes and OpenAI can reuse its cached prompt prefix.
+        """
+        return f'''You are a Business Development Professional. Your task is to analyze a list of government contract opportunities and evaluate their fit with our company's capabilities.
+Our company has the following practice areas:
+{_PRACTICE_AREAS_JSON}
+
+Our preferred agencies are: {_PREFERRED_AGENCIES_TEXT}. Opportunities from these agencies should be given a slightly higher preference (e.g., +1 to fit score if relevant and all other factors are equal).
+
+Instructions:
+1. For each opportunity provided in the JSON input string (which is a list of opportunity objects, each having a 'description' field for your analysis), assess its relevance to our practice areas.
+2. Assign a 'fit_score' from 1 (poor fit) to 10 (excellent fit).
+   - 1-3: Poor fit
+   - 4-5: Moderate fit
+   - 6-7: Good fit
+   - 8-10: Excellent fit
+3. Assign each opportunity to ONLY ONE 'assigned_practice_area' - the most relevant one where it scores highest.
+4. If there's a tie in fit score between practice areas, use this priority order to break ties:
+   1. Business & Technology Services
+   2. Program Management & Delivery
+   3. Human Capital & Workforce Innovation
+   4. Business Transformation & Change Management
+   5. Risk, Safety & Mission Assurance
+   6. Acquisition Lifecycle Management
+   7. Grant Program Management
+5. Provide a CONCISE 'justification' (1 sentence maximum, 15 words or less) for the score and practice area assignment.
+6. Return one item in 'ranked_opportunities' per input opportunity, with 'original_opportunity_id' set to its 'id' and its 'title' and 'notice_id' copied from the input. If no specific practice area clearly fits, use 'Uncategorized'.
+
+7. **Irrelevant Terms:** The following terms generally indicate a poor fit for our company: *{_IRRELEVANT_TERMS_TEXT}*. If an opportunity's primary focus clearly revolves around one or more of these terms, assign a 'fit_score' between 1 and 2 and explicitly state the presence of these irrelevant terms as a key reason in your 'justification'.
+'''
+
+    def _get_client(self) -> AsyncOpenAI:
+        """
+        Returns the async OpenAI client for the running event loop.
+
+        The client's connection pool is bound to the event loop that first uses it, so the
+        client is reused across runs on the same loop and replaced when the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=h2 is not None)
+            self._client = AsyncOpenAI(api_key=self.api_key, timeout=self.timeout, max_retries=self.MAX_RETRIES,
+                                       http_client=http_client)
+            self._client_loop = loop
+        return self._client
+
+    def run_sync(self, coro: Awaitable[T]) -> T:
+        """
+        Runs a coroutine to completion on this agent's own event loop.
+
+        Unlike asyncio.run, the loop is kept between calls, so repeated synchronous calls
+        reuse the same OpenAI connections. If a run is interrupted, the loop is closed.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        try:
+            return self._loop.run_until_complete(coro)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Closes the OpenAI client and the event loop of the synchronous wrappers."""
+        loop = self._loop
+        self._loop = None
+        if loop is None or loop.is_closed():
+            return
+        pending_tasks = asyncio.all_tasks(loop)
+        for task in pending_tasks:
+            task.cancel()
+        if pending_tasks:
+            loop.run_until_complete(asyncio.gather(*pending_tasks, return_exceptions=True))
+        if self._client is not None and self._client_loop is loop:
+            loop.run_until_complete(self._client.close())
+            self._client = None
+            self._client_loop = None
+        loop.close()
+
+    async def aclose(self) -> None:
+        """
+        Closes the OpenAI client if it belongs to the running event loop.
+
+        Call this before a loop started with asyncio.run ends; close() only handles the
+        loop of the synchronous wrappers.
+        """
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            client = self._client
+            self._client = None
+            self._client_loop = None
+            await client.close()
         
     def _empty_usage(self) -> Dict[str, int]:
            """Returns an empty usage dictionary."""
-           return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+           return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+
+    def _cache_key(self, prepared_opp: Dict[str, Any]) -> str:
+        """Returns the analysis cache key for a prepared (rankable) opportunity."""
+        return LLMCache.make_key(prepared_opp["title"], prepared_opp["summary_description_for_output"], prepared_opp["naics_code"],
+                                 self.model, self.TEMPERATURE, self.prompt_version)
 
     def _standardize_opportunity(self, opportunity: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -50,7 +326,8 @@ class BusinessDevelopmentAgent:
         # IMPORTANT: This is a simplified version based on what was visible.
         # You might have a more detailed _standardize_opportunity method.
         # Please ensure you use YOUR version of _standardize_opportunity if it's more complex.
-        opp = opportunity.copy()
+        # Only the raw SAM.gov fields read downstream are carried over; OpportunityAnalyzer restores the rest in its JSON output
+        opp = {key: opportunity[key] for key in self.PASSTHROUGH_FIELDS if key in opportunity}
 
         # Ensure notice_id is populated (SAM.gov uses 'noticeId')
         # The .get() method will return None if 'noticeId' is not in opportunity, 
@@ -103,43 +380,114 @@ class BusinessDevelopmentAgent:
         opp['classificationCode'] = opportunity.get('classificationCode', 'N/A')
 
         # Description
-        opp['descriptionText'] = opp.get('descriptionText', opp.get('description', 'No description available'))
+        opp['descriptionText'] = opportunity.get('descriptionText', opportunity.get('description', 'No description available'))
         
         # Link
         raw_ui_link = opportunity.get('uiLink')
         if not raw_ui_link:
-            try:
-                logger.warning(f"Raw opportunity (Title: {opportunity.get('title', 'N/A')}) is missing 'uiLink' or it's empty. Value: '{raw_ui_link}'. Available keys: {list(opportunity.keys())}")
-            except NameError: # Fallback if logger is not defined
-                print(f"WARNING: Raw opportunity (Title: {opportunity.get('title', 'N/A')}) is missing 'uiLink' or it's empty. Value: '{raw_ui_link}'. Available keys: {list(opportunity.keys())}")
+            # Only every MISSING_LINK_LOG_EVERY-th occurrence is logged, to bound log volume on large runs
+            self._missing_link_count += 1
+            if self._missing_link_count % self.MISSING_LINK_LOG_EVERY == 1:
+                logger.warning(f"Raw opportunity (Title: {opportunity.get('title', 'N/A')}) is missing 'uiLink' or it's empty ({self._missing_link_count} so far). Value: '{raw_ui_link}'. Available keys: {list(opportunity.keys())}")
             
         opp['uiLink'] = raw_ui_link if raw_ui_link else 'N/A'
-        print(f"DEBUG_STANDARDIZE: notice_id={opp.get('notice_id', 'N/A')}, opp['uiLink'] set to: '{opp['uiLink']}'") # DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Standardized notice_id={opp.get('notice_id', 'N/A')}, uiLink set to: '{opp['uiLink']}'")
 
         return opp
 
-    def _prepare_input_for_ranking_model(self, opportunities: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    def _screen_irrelevant_terms(self, prepared_opps: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Scores opportunities whose title names an irrelevant term without sending them to OpenAI.
+
+        Only titles with no practice-area keyword are screened out; anything ambiguous is still
+        left for the model to judge.
+
+        Returns:
+            A tuple of (opportunities still to be ranked, ranked items for the screened-out opportunities).
         """
-        Prepare opportunities data. Rankable opportunities are returned as a list of dicts.
+        remaining: List[Dict[str, Any]] = []
+        low_fit_items: List[Dict[str, Any]] = []
+        for prepared_opp in prepared_opps:
+            match = _IRRELEVANT_TERMS_RE.search(prepared_opp["title"])
+            if match is None or score_cheap({"title": prepared_opp["title"]}) > 0:
+                remaining.append(prepared_opp)
+                continue
+            low_fit_items.append({
+                "original_opportunity_id": prepared_opp["id"],
+                "title": prepared_opp["title"],
+                "notice_id": prepared_opp["notice_id"],
+                "assigned_practice_area": "Uncategorized",
+                "fit_score": 1,
+                "justification": f"Contains irrelevant term: {match.group(0)}",
+            })
+        if low_fit_items:
+            logger.info(f"Scored {len(low_fit_items)} opportunities with irrelevant terms in their titles without OpenAI.")
+        return remaining, low_fit_items
+
+    @staticmethod
+    def _content_hash(prepared_opp: Dict[str, Any]) -> bytes:
+        """Returns a hash of the title, description start and NAICS code, which republished copies share."""
+        content = f"{prepared_opp['title']}|{prepared_opp['summary_description_for_output'][:2000]}|{prepared_opp['naics_code']}"
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+
+    def _group_duplicate_content(self, prepared_opps: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[int, List[Dict[str, Any]]]]:
+        """
+        Groups opportunities whose content is identical under different notice IDs.
+
+        Returns:
+            A tuple of (the first opportunity of each group, the other opportunities of each group keyed by
+            the 'id' of its first one).
+        """
+        representatives: Dict[bytes, Dict[str, Any]] = {}
+        duplicates_by_id: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        for prepared_opp in prepared_opps:
+            representative = representatives.setdefault(self._content_hash(prepared_opp), prepared_opp)
+            if representative is not prepared_opp:
+                duplicates_by_id[representative["id"]].append(prepared_opp)
+        if duplicates_by_id:
+            num_duplicates = sum(map(len, duplicates_by_id.values()))
+            logger.info(f"Ranking {len(representatives)} opportunities once for {num_duplicates} republished copies with identical content.")
+        return list(representatives.values()), duplicates_by_id
+
+    @staticmethod
+    def _copy_to_duplicates(ranked_items: List[Dict[str, Any]],
+                            duplicates_by_id: Dict[int, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Returns ranked items for the duplicates of each ranked opportunity, carrying over its AI fields."""
+        copies: List[Dict[str, Any]] = []
+        for item in ranked_items:
+            for duplicate in duplicates_by_id.get(item.get('original_opportunity_id'), ()):
+                copies.append({
+                    **item,
+                    "original_opportunity_id": duplicate["id"],
+                    "title": duplicate["title"],
+                    "notice_id": duplicate["notice_id"],
+                })
+        return copies
+
+    def _prepare_input_for_ranking_model(self, standardized_opportunities: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Prepare standardized opportunities data. Rankable opportunities are returned as a list of dicts.
         Unrankable opportunities (due to insufficient data) are also returned as a list of dicts.
         """
-        standardized_opportunities = [self._standardize_opportunity(opp) for opp in opportunities]
         rankable_prepared_data = []
         unrankable_opportunities_data = []
         
-        # Keep track of noticeIds to process each unique opportunity once for ranking
-        processed_notice_ids_for_ranking = set()
+        # Process each unique noticeId once; the first occurrence wins. Opportunities without one are all kept.
+        opps_by_notice_id: Dict[str, Dict[str, Any]] = {}
+        opps_without_notice_id: List[Dict[str, Any]] = []
+        for opp in standardized_opportunities:
+            notice_id = opp.get('noticeId')
+            if not notice_id:
+                opps_without_notice_id.append(opp)
+            elif opps_by_notice_id.setdefault(notice_id, opp) is not opp:
+                logger.debug(f"Skipping duplicate noticeId '{notice_id}' for AI ranking preparation.")
 
         rankable_id_counter = 1 # This is used for the 'id' field sent to AI
 
-        for opp in standardized_opportunities:
-            notice_id = opp.get('noticeId', f"MISSING_NOTICE_ID_{rankable_id_counter}") # Fallback if noticeId is missing
+        for opp in chain(opps_by_notice_id.values(), opps_without_notice_id):
+            notice_id = opp.get('noticeId') or f"MISSING_NOTICE_ID_{rankable_id_counter}" # Fallback if noticeId is missing
 
-            # Skip if this notice_id has already been processed for ranking
-            if notice_id in processed_notice_ids_for_ranking and notice_id != f"MISSING_NOTICE_ID_{rankable_id_counter}": # only skip if it's a real ID
-                logger.debug(f"Skipping duplicate noticeId '{notice_id}' for AI ranking preparation.")
-                continue
-            
             title = opp.get('title', 'N/A')
             # department, posted_date, response_date, etc. should come from _standardize_opportunity
             department = opp.get('standardized_department', 'N/A')
@@ -172,13 +520,9 @@ class BusinessDevelopmentAgent:
                     "reason_unranked": f"Title too short (len: {len(title)}) or description too short (len: {len(description)})."
                 })
             else:
-                # Add to processed set only if it's going to be rankable
-                if notice_id != f"MISSING_NOTICE_ID_{rankable_id_counter}": # only add real IDs
-                    processed_notice_ids_for_ranking.add(notice_id)
-
                 # For AI, provide a shorter summary if full description is very long, else full description.
-                # Truncate more aggressively to save tokens (1500 chars is ~300-400 words)
-                ai_description_input = description[:1500] + "...[truncated]" if len(description) > 1500 else description # For AI to read
+                # Truncate aggressively to save tokens (200 tokens is ~150 words)
+                ai_description_input, description_tokens = self._truncate_description(description) # For AI to read
                 summary_desc_for_output = description  # Keep full description for database storage
 
                 rankable_prepared_data.append({
@@ -194,6 +538,7 @@ class BusinessDevelopmentAgent:
                     "set_aside": set_aside,
                     "is_small_business_set_aside": is_sb,
                     "description_for_ai_processing": ai_description_input, 
+                    "description_tokens": description_tokens, # None if unknown; used to size batches
                     "summary_description_for_output": summary_desc_for_output,
                     "link": link
                 })
@@ -206,17 +551,34 @@ class BusinessDevelopmentAgent:
         return rankable_prepared_data, unrankable_opportunities_data
     
 
-    def get_ranked_opportunities_json(self, opportunities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def get_ranked_opportunities_json(self, opportunities: List[Dict[str, Any]],
+                                      standardized_opportunities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Synchronous wrapper around get_ranked_opportunities_json_async for callers without an event loop.
+        """
+        return self.run_sync(self.get_ranked_opportunities_json_async(opportunities, standardized_opportunities))
+
+    async def get_ranked_opportunities_json_async(self, opportunities: List[Dict[str, Any]],
+                                                  standardized_opportunities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Uses OpenAI to rank opportunities in batches and returns the result as JSON,
         including both ranked and unranked items, and aggregated token usage.
+
+        Batches are independent, so up to max_concurrency of them are sent to OpenAI concurrently.
+
+        Args:
+            opportunities: Raw SAM.gov opportunities.
+            standardized_opportunities: The opportunities already passed through _standardize_opportunity,
+                in the same order, if the caller has them. Otherwise they are standardized here.
         """
         logger.info(f"BusinessDevelopmentAgent received {len(opportunities)} opportunities for processing.")
         if not opportunities:
             logger.info("No opportunities data provided to BusinessDevelopmentAgent.")
             return {"ranked_opportunities": [], "unranked_opportunities": [], "usage": self._empty_usage(), "error": "No opportunities provided."}
 
-        rankable_opportunities_list, unrankable_opportunities_data = self._prepare_input_for_ranking_model(opportunities)
+        if standardized_opportunities is None:
+            standardized_opportunities = [self._standardize_opportunity(opp) for opp in opportunities]
+        rankable_opportunities_list, unrankable_opportunities_data = self._prepare_input_for_ranking_model(standardized_opportunities)
         
         num_rankable_for_ai = len(rankable_opportunities_list)
         
@@ -238,124 +600,111 @@ class BusinessDevelopmentAgent:
             logger.info("No opportunities were deemed suitable for AI ranking. Returning unranked items only.")
             return {"ranked_opportunities": [], "unranked_opportunities": unrankable_opportunities_data, "usage": self._empty_usage()}
 
-        system_message_content = f'''
-You are a Business Development Professional. Your task is to analyze a list of government contract opportunities and evaluate their fit with our company's capabilities.
-Our company has the following practice areas:
-{json.dumps(PRACTICE_AREAS, indent=2)}
+        system_message_content = self._system_message
+        BATCH_SIZE = self.BATCH_SIZE # Class attribute for max batch size
 
-Our preferred agencies are: {', '.join(PREFERRED_AGENCIES)}. Opportunities from these agencies should be given a slightly higher preference (e.g., +1 to fit score if relevant and all other factors are equal).
+        all_ranked_opportunities_from_ai = []
+        aggregated_usage = self._empty_usage()
 
-Instructions:
-1. For each opportunity provided in the JSON input string (which is a list of opportunity objects, each having a 'description_for_ai_processing' field for your analysis), assess its relevance to our practice areas.
-2. Assign a 'fit_score' from 1 (poor fit) to 10 (excellent fit).
-   - 1-3: Poor fit
-   - 4-5: Moderate fit
-   - 6-7: Good fit
-   - 8-10: Excellent fit
-3. Assign each opportunity to ONLY ONE 'assigned_practice_area' - the most relevant one where it scores highest.
-4. If there's a tie in fit score between practice areas, use this priority order to break ties:
-   1. Business & Technology Services
-   2. Program Management & Delivery
-   3. Human Capital & Workforce Innovation
-   4. Business Transformation & Change Management
-   5. Risk, Safety & Mission Assurance
-   6. Acquisition Lifecycle Management
-   7. Grant Program Management
-5. Provide a CONCISE 'justification' (1 sentence maximum, 15 words or less) for the score and practice area assignment.
-6. Structure your output as a single JSON object. This object must have a key "ranked_opportunities", whose value is a list of objects. Each object in this list represents an analyzed opportunity and must include:
-   - 'original_opportunity_id': The 'id' from the input JSON for that opportunity.
-   - 'title': The opportunity title (from input).
-   - 'notice_id': The notice ID (from input).
-   - 'assigned_practice_area': The practice area you assigned. If no specific practice area clearly fits, assign the value 'Uncategorized'. This field must always be present.
-   - 'fit_score': Your calculated fit score (integer 1-10).
-   - 'justification': Your brief justification (string, 15 words max).
+        # Opportunities that are plainly about an irrelevant term get a low score without an API call
+        rankable_opportunities_list, low_fit_items = self._screen_irrelevant_terms(rankable_opportunities_list)
+        all_ranked_opportunities_from_ai.extend(low_fit_items)
 
-   DO NOT include: department, posted_date, response_date, set_aside, summary_description, or link in your response. We already have these fields.
+        # Republished copies of the same opportunity are ranked once, through their first occurrence
+        rankable_opportunities_list, duplicates_by_id = self._group_duplicate_content(rankable_opportunities_list)
+        num_rankable_for_ai = len(rankable_opportunities_list)
 
-7. **Irrelevant Terms:** The following terms generally indicate a poor fit for our company: *Membership Renewal, Medical Services, Fire Alarm, Trauma, Injury, Expert Witness, Data Entry, Culinary, Geospatial, Heritage Resource, Chemical, Surface Power, Laptops, Hardware, Helpdesk, Geophysical, Subscription, Network Support, Targeting, Commercial Solutions, Indian, Specimen, Sensors, Software Licensing, Licensing, Enterprise License, Battlefield, Warfighter*, Fire Suppression, Fire Alarm. If an opportunity's primary focus clearly revolves around one or more of these terms, assign a 'fit_score' between 1 and 2 and explicitly state the presence of these irrelevant terms as a key reason in your 'justification'.
+        # Reuse analyses from previous runs and only send cache misses to OpenAI
+        if self.cache is not None:
+            uncached_opportunities_list = []
+            for prepared_opp in rankable_opportunities_list:
+                cached_analysis = self.cache.get(self._cache_key(prepared_opp))
+                if cached_analysis is not None:
+                    all_ranked_opportunities_from_ai.append({
+                        **cached_analysis,
+                        "original_opportunity_id": prepared_opp["id"],
+                        "title": prepared_opp["title"],
+                        "notice_id": prepared_opp["notice_id"],
+                    })
+                else:
+                    uncached_opportunities_list.append(prepared_opp)
+            num_cache_hits = len(rankable_opportunities_list) - len(uncached_opportunities_list)
+            logger.info(f"Analysis cache: {num_cache_hits} hits, {len(uncached_opportunities_list)} misses.")
+            rankable_opportunities_list = uncached_opportunities_list
+            num_rankable_for_ai = len(rankable_opportunities_list)
 
-Example of an item in the output 'ranked_opportunities' list:
-{{ "original_opportunity_id": 1, "title": "Example Title", "notice_id": "EX123", "assigned_practice_area": "Business & Technology Services", "fit_score": 8, "justification": "Strong alignment with tech services capabilities." }}
+        client = self._get_client()
 
-Ensure the entire output is a valid JSON object adhering to this structure.
-'''
-        BATCH_SIZE = self.BATCH_SIZE # Class attribute for batch size
+        # Reuse analyses of near-duplicates of previously analyzed opportunities
+        embeddings_by_id: Dict[int, List[float]] = {}
+        if self.semantic_cache is not None and self.semantic_cache.enabled and rankable_opportunities_list:
+            rankable_opportunities_list, embeddings_by_id = await self._apply_semantic_cache(
+                client, rankable_opportunities_list, all_ranked_opportunities_from_ai
+            )
+            num_rankable_for_ai = len(rankable_opportunities_list)
+        prepared_opps_by_id = {prepared_opp["id"]: prepared_opp for prepared_opp in rankable_opportunities_list}
 
-        all_ranked_opportunities_from_ai = []
-        aggregated_usage = self._empty_usage()
+        batches = self._make_batches(rankable_opportunities_list, system_message_content)
+        total_batches = len(batches)
+        logger.info(f"Starting batch processing for {num_rankable_for_ai} rankable opportunities in {total_batches} batches of up to {BATCH_SIZE}.")
 
-        logger.info(f"Starting batch processing for {num_rankable_for_ai} rankable opportunities in batches of {BATCH_SIZE}.")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
-        for i in range(0, num_rankable_for_ai, BATCH_SIZE):
-            current_batch_list = rankable_opportunities_list[i:i + BATCH_SIZE]
-            current_batch_input_str = json.dumps(current_batch_list) # Convert current batch to JSON string
-            
-            batch_number = (i // BATCH_SIZE) + 1
-            total_batches = (num_rankable_for_ai + BATCH_SIZE - 1) // BATCH_SIZE
-            
-            logger.info(f"Processing batch {batch_number}/{total_batches} with {len(current_batch_list)} opportunities.")
+        async def rank_bounded(batch_list: List[Dict[str, Any]],
+                               batch_number: Union[int, str]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+            async with semaphore:
+                batch_items, batch_usage = await self._rank_batch(client, system_message_content, batch_list, batch_number, total_batches)
+            return await check_batch(batch_list, batch_number, batch_items, batch_usage)
 
-            user_message_content = f"Please analyze the following opportunities based on the instructions:\n{current_batch_input_str}"
+        async def check_batch(batch_list: List[Dict[str, Any]], batch_number: Union[int, str],
+                              batch_items: List[Dict[str, Any]],
+                              batch_usage: Dict[str, int]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+            batch_items, missing_opps = self._validate_batch_items(batch_list, batch_items, batch_number)
+            if missing_opps and len(batch_list) > 1:
+                # A malformed batch response should not lose the whole batch, so re-rank what is missing one by one
+                logger.warning(f"Re-ranking {len(missing_opps)} opportunities from batch {batch_number} individually.")
+                retry_results = await asyncio.gather(*(
+                    rank_bounded([opp], f"{batch_number}.{retry_idx}") for retry_idx, opp in enumerate(missing_opps, 1)
+                ))
+                for retry_items, retry_usage in retry_results:
+                    batch_items.extend(retry_items)
+                    for usage_key in batch_usage:
+                        batch_usage[usage_key] += retry_usage.get(usage_key, 0)
+            return batch_items, batch_usage
 
-            try:
-                logger.info(f"Sending batch {batch_number} to OpenAI for analysis (Model: {self.model})...")
-                
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_message_content},
-                        {"role": "user", "content": user_message_content}
-                    ],
-                    response_format={"type": "json_object"},
-                    temperature=0.1,
-                )
-                
-                ai_response_content_batch = response.choices[0].message.content
-                logger.info(f"Raw AI response for batch {batch_number} received (length: {len(ai_response_content_batch)} chars). First 100 chars: {ai_response_content_batch[:100]}")
-
-                if response.usage:
-                    usage_data_batch = {
-                        "prompt_tokens": response.usage.prompt_tokens,
-                        "completion_tokens": response.usage.completion_tokens,
-                        "total_tokens": response.usage.total_tokens
-                    }
-                    logger.info(f"OpenAI API usage for batch {batch_number}: {usage_data_batch}")
-                    aggregated_usage["prompt_tokens"] += usage_data_batch.get("prompt_tokens", 0)
-                    aggregated_usage["completion_tokens"] += usage_data_batch.get("completion_tokens", 0)
-                    aggregated_usage["total_tokens"] += usage_data_batch.get("total_tokens", 0)
-                else:
-                    logger.warning(f"No usage data in response for batch {batch_number}.")
+        batch_api_results = None
+        if self.use_batch_api and batches:
+            batch_api_results = await self._rank_with_batch_api(client, system_message_content, batches)
 
+        if batch_api_results is not None:
+            batch_results = await asyncio.gather(*(
+                check_batch(batch_list, batch_number, batch_items, batch_usage)
+                for batch_number, (batch_list, (batch_items, batch_usage)) in enumerate(zip(batches, batch_api_results), 1)
+            ))
+        else:
+            batch_results = await asyncio.gather(*(
+                rank_bounded(batch_list, batch_number) for batch_number, batch_list in enumerate(batches, 1)
+            ))
 
-                try:
-                    parsed_ai_response_batch = json.loads(ai_response_content_batch)
-                    logger.info(f"Successfully parsed AI response for batch {batch_number}. Type: {type(parsed_ai_response_batch)}")
-                    
-                    if isinstance(parsed_ai_response_batch, dict):
-                        raw_ranked_list_batch = parsed_ai_response_batch.get("ranked_opportunities")
-                        
-                        if raw_ranked_list_batch is None:
-                            logger.warning(f"'ranked_opportunities' key not found in AI response for batch {batch_number}.")
-                        elif not isinstance(raw_ranked_list_batch, list):
-                            logger.warning(f"'ranked_opportunities' in AI response for batch {batch_number} is not a list. Type: {type(raw_ranked_list_batch)}. Content (first 100 chars): {str(raw_ranked_list_batch)[:100]}")
-                        else:
-                            logger.info(f"Extracted {len(raw_ranked_list_batch)} items from 'ranked_opportunities' in batch {batch_number}.")
-                            for item in raw_ranked_list_batch:
-                                if isinstance(item, dict):
-                                    all_ranked_opportunities_from_ai.append(item)
-                                else:
-                                    logger.warning(f"Item in 'ranked_opportunities' from batch {batch_number} is not a dict: {str(item)[:100]}")
-                    else:
-                        logger.warning(f"Parsed AI response for batch {batch_number} is not a dictionary. Type: {type(parsed_ai_response_batch)}. Content (first 100 chars): {str(parsed_ai_response_batch)[:100]}")
+        for batch_items, usage_data_batch in batch_results:
+            for usage_key in aggregated_usage:
+                aggregated_usage[usage_key] += usage_data_batch.get(usage_key, 0)
+            for item in batch_items:
+                all_ranked_opportunities_from_ai.append(item)
+                self._store_in_cache(prepared_opps_by_id, item, embeddings_by_id)
 
-                except json.JSONDecodeError as e_json:
-                    logger.error(f"Failed to decode AI JSON response for batch {batch_number}: {e_json}. Response (first 200 chars): {ai_response_content_batch[:200]}")
-                
-            except Exception as e_batch_call:
-                logger.error(f"An error occurred during OpenAI API call or processing for batch {batch_number}: {str(e_batch_call)}", exc_info=True)
+        if duplicates_by_id:
+            all_ranked_opportunities_from_ai.extend(self._copy_to_duplicates(all_ranked_opportunities_from_ai, duplicates_by_id))
 
         logger.info(f"Finished all batches. Total ranked opportunities aggregated before validation: {len(all_ranked_opportunities_from_ai)}")
         logger.info(f"Aggregated OpenAI API usage: {aggregated_usage}")
+        if aggregated_usage["prompt_tokens"]:
+            cached_ratio = aggregated_usage["cached_tokens"] / aggregated_usage["prompt_tokens"]
+            logger.info(f"OpenAI prompt cache: {cached_ratio:.0%} of prompt tokens were cached.")
+        if self.cache is not None:
+            logger.info(f"Analysis cache stats: {self.cache.stats}")
+        if self.semantic_cache is not None:
+            logger.info(f"Semantic analysis cache stats: {self.semantic_cache.stats}")
 
         final_ranked_opportunities = []
         if all_ranked_opportunities_from_ai:
@@ -376,101 +725,539 @@ Ensure the entire output is a valid JSON object adhering to this structure.
             "usage": aggregated_usage
         }
 
+    async def _rank_batch(self, client: AsyncOpenAI, system_message_content: str,
+                          current_batch_list: List[Dict[str, Any]], batch_number: int,
+                          total_batches: int) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Sends one batch of prepared opportunities to OpenAI for ranking.
+
+        Errors are logged rather than raised so that one failed batch does not lose the others.
+
+        Returns:
+            A tuple of (ranked items returned by the AI, token usage for the batch).
+        """
+        batch_items: List[Dict[str, Any]] = []
+        usage_data_batch = self._empty_usage()
+
+        logger.info(f"Processing batch {batch_number}/{total_batches} with {len(current_batch_list)} opportunities.")
+
+        try:
+            logger.info(f"Sending batch {batch_number} to OpenAI for analysis (Model: {self.model})...")
+            
+            response = await client.chat.completions.create(
+                **self._ranking_request_body(system_message_content, current_batch_list),
+                extra_body={"prompt_cache_key": self.prompt_version},
+            )
+            
+            ai_response_content_batch = response.choices[0].message.content
+            logger.info(f"Raw AI response for batch {batch_number} received (length: {len(ai_response_content_batch)} chars). First 100 chars: {ai_response_content_batch[:100]}")
+
+            if response.usage:
+                prompt_tokens_details = getattr(response.usage, "prompt_tokens_details", None)
+                usage_data_batch = {
+                    "prompt_tokens": response.usage.prompt_tokens,
+                    "completion_tokens": response.usage.completion_tokens,
+                    "total_tokens": response.usage.total_tokens,
+                    "cached_tokens": getattr(prompt_tokens_details, "cached_tokens", None) or 0,
+                }
+                logger.info(f"OpenAI API usage for batch {batch_number}: {usage_data_batch}")
+            else:
+                logger.warning(f"No usage data in response for batch {batch_number}.")
+
+            batch_items = self._parse_ranking_response(ai_response_content_batch, batch_number)
+            
+        except Exception as e_batch_call:
+            logger.error(f"An error occurred during OpenAI API call or processing for batch {batch_number}: {str(e_batch_call)}", exc_info=True)
+
+        return batch_items, usage_data_batch
+
+    def _compact_for_prompt(self, prepared_opp: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the subset of a prepared opportunity that the model needs for ranking."""
+        return {prompt_key: prepared_opp.get(field) for field, prompt_key in self.AI_PROMPT_FIELDS}
+
+    def _prompt_json(self, prepared_opp: Dict[str, Any]) -> str:
+        """
+        Returns the compact JSON sent to the model for an opportunity.
+
+        It is serialized once and kept on the prepared opportunity, for batch sizing, the batch
+        request and any individual re-ranking.
+        """
+        prompt_json = prepared_opp.get("prompt_json")
+        if prompt_json is None:
+            prompt_json = prepared_opp["prompt_json"] = _dumps_json(self._compact_for_prompt(prepared_opp))
+        return prompt_json
+
+    def _estimate_prompt_tokens(self, prepared_opp: Dict[str, Any]) -> int:
+        """Estimates the prompt tokens an opportunity adds to a request, using its counted description tokens if known."""
+        prompt_json_chars = len(self._prompt_json(prepared_opp))
+        description_tokens = prepared_opp.get("description_tokens")
+        if description_tokens is None:
+            return prompt_json_chars // 4
+        return (prompt_json_chars - len(prepared_opp["description_for_ai_processing"])) // 4 + description_tokens
+
+    def _make_batches(self, prepared_opps: List[Dict[str, Any]], system_message_content: str) -> List[List[Dict[str, Any]]]:
+        """
+        Packs prepared opportunities into batches of at most BATCH_SIZE.
+
+        A batch is closed early once its estimated prompt tokens (counted descriptions plus about
+        4 characters per token for the rest, system prompt included) would exceed MAX_INPUT_TOKENS.
+        """
+        token_budget = self.MAX_INPUT_TOKENS - len(system_message_content) // 4
+        batches: List[List[Dict[str, Any]]] = []
+        current_batch: List[Dict[str, Any]] = []
+        current_tokens = 0
+        for prepared_opp in prepared_opps:
+            opp_tokens = self._estimate_prompt_tokens(prepared_opp)
+            if current_batch and (len(current_batch) >= self.BATCH_SIZE or current_tokens + opp_tokens > token_budget):
+                batches.append(current_batch)
+                current_batch, current_tokens = [], 0
+            current_batch.append(prepared_opp)
+            current_tokens += opp_tokens
+        if current_batch:
+            batches.append(current_batch)
+        return batches
+
+    def _ranking_request_body(self, system_message_content: str, current_batch_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Builds the chat completions request for ranking one batch of prepared opportunities."""
+        # Convert current batch to a compact JSON string from the opportunities' serialized forms
+        current_batch_input_str = "[" + ",".join(map(self._prompt_json, current_batch_list)) + "]"
+        user_message_content = f"Please analyze the following opportunities based on the instructions:\n{current_batch_input_str}"
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_message_content},
+                {"role": "user", "content": user_message_content}
+            ],
+            "response_format": RANKING_RESPONSE_FORMAT,
+            "temperature": self.TEMPERATURE,
+        }
+
+    def _parse_ranking_response(self, ai_response_content_batch: str, batch_number: Union[int, str]) -> List[Dict[str, Any]]:
+        """
+        Extracts the ranked items from the AI's JSON response for one batch.
+
+        Malformed responses are logged and yield no items.
+        """
+        batch_items: List[Dict[str, Any]] = []
+        try:
+            parsed_ai_response_batch = _loads_json(ai_response_content_batch)
+            logger.info(f"Successfully parsed AI response for batch {batch_number}. Type: {type(parsed_ai_response_batch)}")
+            
+            if isinstance(parsed_ai_response_batch, dict):
+                raw_ranked_list_batch = parsed_ai_response_batch.get("ranked_opportunities")
+                
+                if raw_ranked_list_batch is None:
+                    logger.warning(f"'ranked_opportunities' key not found in AI response for batch {batch_number}.")
+                elif not isinstance(raw_ranked_list_batch, list):
+                    logger.warning(f"'ranked_opportunities' in AI response for batch {batch_number} is not a list. Type: {type(raw_ranked_list_batch)}. Content (first 100 chars): {str(raw_ranked_list_batch)[:100]}")
+                else:
+                    logger.info(f"Extracted {len(raw_ranked_list_batch)} items from 'ranked_opportunities' in batch {batch_number}.")
+                    for item in raw_ranked_list_batch:
+                        if isinstance(item, dict):
+                            batch_items.append(item)
+                        else:
+                            logger.warning(f"Item in 'ranked_opportunities' from batch {batch_number} is not a dict: {str(item)[:100]}")
+            else:
+                logger.warning(f"Parsed AI response for batch {batch_number} is not a dictionary. Type: {type(parsed_ai_response_batch)}. Content (first 100 chars): {str(parsed_ai_response_batch)[:100]}")
+
+        except json.JSONDecodeError as e_json:
+            logger.error(f"Failed to decode AI JSON response for batch {batch_number}: {e_json}. Response (first 200 chars): {ai_response_content_batch[:200]}")
+        return batch_items
+
+    async def _rank_with_batch_api(self, client: AsyncOpenAI, system_message_content: str,
+                                   batches: List[List[Dict[str, Any]]]) -> Optional[List[Tuple[List[Dict[str, Any]], Dict[str, int]]]]:
+        """
+        Ranks all batches with one OpenAI Batch API job and waits for it to finish.
+
+        Each batch becomes one line of the job's JSONL input, with the same request body as
+        the synchronous path. The job status is polled with exponential backoff. A job that has
+        not completed within BATCH_API_MAX_WAIT seconds is cancelled.
+
+        Returns:
+            A (ranked items, token usage) tuple per batch, in the order of batches, or None if
+            the job could not be run, so that the caller can fall back to synchronous requests.
+        """
+        jsonl_lines = [
+            _dumps_json({
+                "custom_id": f"batch-{batch_number}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {**self._ranking_request_body(system_message_content, batch_list), "prompt_cache_key": self.prompt_version},
+            })
+            for batch_number, batch_list in enumerate(batches, 1)
+        ]
+        batch_job = None
+        try:
+            input_file = await client.files.create(
+                file=("ranking_batches.jsonl", "\n".join(jsonl_lines).encode("utf-8")),
+                purpose="batch",
+            )
+            batch_job = await client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            logger.info(f"Submitted OpenAI Batch API job {batch_job.id} with {len(batches)} batches.")
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.BATCH_API_MAX_WAIT
+            delay = self.BATCH_API_POLL_INITIAL_DELAY
+            while batch_job.status != "completed":
+                if batch_job.status in self.BATCH_API_FAILED_STATUSES:
+                    logger.error(f"OpenAI Batch API job {batch_job.id} ended with status '{batch_job.status}': {batch_job.errors}")
+                    return None
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    logger.error(f"OpenAI Batch API job {batch_job.id} did not complete within {self.BATCH_API_MAX_WAIT} seconds.")
+                    await self._cancel_batch_job(client, batch_job.id)
+                    return None
+                delay = min(delay, remaining)
+                logger.info(f"OpenAI Batch API job {batch_job.id} is '{batch_job.status}'. Checking again in {delay:.0f} seconds.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.BATCH_API_POLL_MAX_DELAY)
+                batch_job = await client.batches.retrieve(batch_job.id)
+
+            if batch_job.error_file_id:
+                logger.warning(f"OpenAI Batch API job {batch_job.id} has failed requests in error file {batch_job.error_file_id}.")
+            output_text = (await client.files.content(batch_job.output_file_id)).text if batch_job.output_file_id else ""
+        except Exception as e:
+            logger.error(f"OpenAI Batch API job failed: {str(e)}", exc_info=True)
+            if batch_job is not None and batch_job.status not in self.BATCH_API_FAILED_STATUSES | {"completed"}:
+                # Don't leave a job running that nothing will collect
+                await self._cancel_batch_job(client, batch_job.id)
+            return None
+
+        # Batches without a usable output line keep no items, so check_batch re-ranks their opportunities individually
+        results = [([], self._empty_usage()) for _ in batches]
+        for line in output_text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                result = _loads_json(line)
+                batch_number = int(result["custom_id"].rsplit("-", 1)[1])
+                if not 1 <= batch_number <= len(batches):
+                    raise ValueError(f"unknown batch number {batch_number}")
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    logger.error(f"OpenAI Batch API request for batch {batch_number} failed: {result.get('error') or response.get('body')}")
+                    continue
+                body = response["body"]
+                content = body["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                logger.error(f"Skipping malformed OpenAI Batch API output line ({e}): {line[:200]}")
+                continue
+            usage = body.get("usage") or {}
+            batch_usage = {usage_key: usage.get(usage_key, 0) for usage_key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+            batch_usage["cached_tokens"] = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            results[batch_number - 1] = (self._parse_ranking_response(content, batch_number), batch_usage)
+        logger.info(f"OpenAI Batch API job {batch_job.id} completed.")
+        return results
+
+    @staticmethod
+    async def _cancel_batch_job(client: AsyncOpenAI, batch_job_id: str) -> None:
+        """Cancels a Batch API job whose results will not be collected, logging rather than raising on failure."""
+        try:
+            await client.batches.cancel(batch_job_id)
+            logger.warning(f"Cancelled OpenAI Batch API job {batch_job_id}; ranking synchronously instead.")
+        except Exception as e:
+            logger.error(f"Could not cancel OpenAI Batch API job {batch_job_id}: {str(e)}")
+
+    def _validate_batch_items(self, batch_list: List[Dict[str, Any]], batch_items: List[Dict[str, Any]],
+                              batch_number: Union[int, str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Checks the items returned by the AI against the opportunities that were sent in the batch.
+
+        Items with an unknown or repeated 'original_opportunity_id', or whose 'notice_id' does not
+        match the opportunity sent with that id, are dropped.
+
+        Returns:
+            A tuple of (valid items, prepared opportunities that got no valid item back).
+        """
+        sent_opps_by_id = {prepared_opp["id"]: prepared_opp for prepared_opp in batch_list}
+        valid_items: List[Dict[str, Any]] = []
+        returned_ids: set = set()
+
+        for item in batch_items:
+            original_id = item.get('original_opportunity_id')
+            if isinstance(original_id, str) and original_id.isdigit():
+                original_id = int(original_id) # The model occasionally returns ids as strings
+                item['original_opportunity_id'] = original_id
+
+            prepared_opp = sent_opps_by_id.get(original_id)
+            if prepared_opp is None or original_id in returned_ids:
+                logger.warning(f"Dropping item from batch {batch_number} with unknown or duplicate original_opportunity_id: {str(item)[:100]}")
+                continue
+            if item.get('notice_id') != prepared_opp["notice_id"]:
+                logger.warning(f"Dropping item from batch {batch_number} whose notice_id does not match the opportunity sent as id {original_id}: {str(item)[:100]}")
+                continue
+
+            returned_ids.add(original_id)
+            valid_items.append(item)
+
+        missing_opps = [prepared_opp for opp_id, prepared_opp in sent_opps_by_id.items() if opp_id not in returned_ids]
+        if missing_opps:
+            logger.warning(f"Batch {batch_number} returned no valid result for {len(missing_opps)} of {len(batch_list)} opportunities.")
+        return valid_items, missing_opps
+
+    async def _apply_semantic_cache(self, client: AsyncOpenAI, rankable_opportunities_list: List[Dict[str, Any]],
+                                    ranked_items: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[int, List[float]]]:
+        """
+        Embeds the opportunities and reuses the analysis of any near-duplicate in the semantic cache.
+
+        Hits are appended to ranked_items. If embedding fails, every opportunity is treated as a miss.
+
+        Returns:
+            A tuple of (opportunities still to be ranked, embeddings of those opportunities by their 'id').
+        """
+        texts = [
+            SemanticCache.embedding_text(prepared_opp["title"], prepared_opp["summary_description_for_output"])
+            for prepared_opp in rankable_opportunities_list
+        ]
+        try:
+            response = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
+        except Exception as e:
+            logger.error(f"Failed to embed opportunities for the semantic cache: {str(e)}")
+            return rankable_opportunities_list, {}
+
+        # The similarity scan is CPU-bound, so it runs off the event loop
+        similar_analyses = await asyncio.to_thread(
+            self.semantic_cache.lookup_many,
+            [(embedding.embedding, prepared_opp["naics_code"])
+             for prepared_opp, embedding in zip(rankable_opportunities_list, response.data)],
+            self._semantic_cache_scope,
+        )
+        misses: List[Dict[str, Any]] = []
+        embeddings_by_id: Dict[int, List[float]] = {}
+        for prepared_opp, embedding, similar_analysis in zip(rankable_opportunities_list, response.data, similar_analyses):
+            if similar_analysis is not None:
+                ranked_items.append({
+                    **similar_analysis,
+                    "original_opportunity_id": prepared_opp["id"],
+                    "title": prepared_opp["title"],
+                    "notice_id": prepared_opp["notice_id"],
+                })
+            else:
+                misses.append(prepared_opp)
+                embeddings_by_id[prepared_opp["id"]] = embedding.embedding
+        logger.info(f"Semantic analysis cache: {len(rankable_opportunities_list) - len(misses)} hits, {len(misses)} misses.")
+        return misses, embeddings_by_id
+
+    def _store_in_cache(self, prepared_opps_by_id: Dict[int, Dict[str, Any]], ai_item: Dict[str, Any],
+                        embeddings_by_id: Optional[Dict[int, List[float]]] = None) -> None:
+        """Caches the AI fields of a ranked item if it maps back to the opportunity that was sent."""
+        if self.cache is None and self.semantic_cache is None:
+            return
+        prepared_opp = prepared_opps_by_id.get(ai_item.get('original_opportunity_id'))
+        if prepared_opp is None or ai_item.get('notice_id') != prepared_opp["notice_id"]:
+            return
+        analysis = {
+            "assigned_practice_area": ai_item.get('assigned_practice_area'),
+            "fit_score": ai_item.get('fit_score'),
+            "justification": ai_item.get('justification'),
+        }
+        if self.cache is not None:
+            self.cache.set(self._cache_key(prepared_opp), analysis)
+        embedding = (embeddings_by_id or {}).get(prepared_opp["id"])
+        if self.semantic_cache is not None and embedding is not None:
+            self.semantic_cache.add(prepared_opp["notice_id"], embedding, prepared_opp["naics_code"],
+                                    self._semantic_cache_scope, analysis)
+
+# Report field -> opportunity keys it is read from, in order of preference
+_REPORT_FIELD_ALIASES = {
+    "title": ("title",),
+    "notice_id": ("notice_id", "noticeId"),
+    "department": ("department", "agency"),
+    "posted_date": ("posted_date", "postedDate"),
+    "response_date": ("response_date", "responseDate"),
+    "set_aside": ("set_aside", "setAside"),
+    "fit_score": ("fit_score",),
+    "justification": ("justification",),
+    "summary_description": ("summary_description", "summaryDescription"),
+    "link": ("link", "uiLink"),
+}
+
+_RANKED_OPPORTUNITY_TEMPLATE = (
+    "\n#### {title}\n"
+    "- **Notice ID:** {notice_id}\n"
+    "- **Department/Agency:** {department}\n"
+    "- **Posted Date:** {posted_date}\n"
+    "- **Response Date:** {response_date}\n"
+    "- **Set Aside:** {set_aside}\n"
+    "- **Fit Score:** {fit_score}\n"
+    "- **Justification:** {justification}\n"
+    "- **Summary Description:** {summary_description}\n"
+    "- **Link:** [{link}]({link_url})"
+)
+
+_UNRANKED_OPPORTUNITY_TEMPLATE = (
+    "\n### {title}\n"
+    "- **Notice ID:** {notice_id}\n"
+    "- **Department/Agency:** {department}\n"
+    "- **Set Aside:** {set_aside}\n"
+    "- **Response Date:** {response_date}\n"
+    "- **Link:** [{link}]({link_url})\n"
+    "  - _This opportunity was not ranked due to limited information or other factors._"
+)
+
+def _report_fields(opp: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolves each report field of an opportunity from the first of its alias keys that is present."""
+    fields = {
+        field: next((opp[key] for key in aliases if key in opp), 'N/A')
+        for field, aliases in _REPORT_FIELD_ALIASES.items()
+    }
+    fields["summary_description"] = fields["summary_description"] or 'N/A'
+    fields["link_url"] = fields["link"] if any(key in opp for key in _REPORT_FIELD_ALIASES["link"]) else '#'
+    return fields
+
+def _fit_score_sort_key(opp: Dict[str, Any]) -> int:
+    """Returns an opportunity's fit score as an int for sorting, treating a missing or invalid score as 0."""
+    try:
+        return int(opp.get('fit_score') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _format_ranked_opportunity(opp: Dict[str, Any]) -> str:
+    """Formats one ranked opportunity as a markdown block for the report."""
+    return _RANKED_OPPORTUNITY_TEMPLATE.format(**_report_fields(opp))
+
+def _format_unranked_opportunity(opp: Dict[str, Any]) -> str:
+    """Formats one unranked opportunity as a markdown block for the report."""
+    return _UNRANKED_OPPORTUNITY_TEMPLATE.format(**_report_fields(opp))
+
 class ReportAgent:
-    def __init__(self, openai_api_key: str, model: str = "gpt-4o-mini"):
+    def __init__(self, openai_api_key: str, model: str = "gpt-4o-mini") -> None:
         # Assuming existing __init__ structure.
         # self.openai_client = OpenAI(api_key=openai_api_key) # Example, if client is initialized here
         self.model = model
 
-    def generate_markdown_report(self,
-                                 ranked_opportunities_batch: List[Dict[str, Any]],
-                                 unranked_opportunities_batch: List[Dict[str, Any]],
-                                 report_title_prefix: str = "Opportunity Analysis Report",
-                                 part_info: Optional[str] = None,
-                                 generated_on_timestamp: Optional[str] = None):
-        lines = []
+    @staticmethod
+    def _current_timestamp() -> str:
+        """Returns the current UTC time formatted for report headers."""
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
 
-        if generated_on_timestamp:
-            gen_time_str = generated_on_timestamp
-        else:
-            # Generate a timestamp if not provided
-            if pytz:
-                gen_time_str = datetime.now(pytz.utc).strftime("%Y-%m-%d %H:%M:%S %Z")
-            else:
-                gen_time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC (pytz not available)")
+    def render_header(self,
+                      report_title_prefix: str = "Opportunity Analysis Report",
+                      part_info: Optional[str] = None,
+                      generated_on_timestamp: Optional[str] = None) -> str:
+        """
+        Renders the report title and "Generated on" line.
+
+        Args:
+            report_title_prefix: The report title.
+            part_info: Optional part label appended to the title, e.g. "(Part 1 of 3)".
+            generated_on_timestamp: Timestamp to show. Defaults to the current UTC time.
+        """
+        # Generate a timestamp if not provided
+        gen_time_str = generated_on_timestamp or self._current_timestamp()
         
         title_line = f"# {report_title_prefix}"
         if part_info:
             title_line += f" {part_info}" # e.g., " (Part 1 of 3)"
-        lines.append(title_line)
-        lines.append(f"\n_Generated on: {gen_time_str}_\n")
+        return f"{title_line}\n\n_Generated on: {gen_time_str}_\n"
 
-        first_item_in_report = True # Tracks if any item has been added to add HR correctly
+    def render_batch(self, opportunities_batch: List[Dict[str, Any]], kind: str, first_item_in_report: bool = True) -> str:
+        """
+        Renders the ranked or unranked opportunities section for a batch of opportunities.
 
-        if ranked_opportunities_batch:
-            lines.append("## Ranked Opportunities by Practice Area")
+        Args:
+            opportunities_batch: The opportunities to render.
+            kind: 'ranked' or 'unranked'.
+            first_item_in_report: False if items were already rendered above this section,
+                so the first item here also gets a separator.
+
+        Returns:
+            The section markdown, or an empty string for an empty batch.
+        """
+        if not opportunities_batch:
+            return ""
+
+        # Each piece after the section heading starts with the newline that separates it from the previous one
+        buffer = io.StringIO()
+        write = buffer.write
+
+        if kind == 'ranked':
+            write("## Ranked Opportunities by Practice Area")
             
-            grouped_batch = {}
-            for opp in ranked_opportunities_batch:
-                pa = opp.get('assigned_practice_area', 'Uncategorized')
-                if not pa: pa = 'Uncategorized'
-                if pa not in grouped_batch:
-                    grouped_batch[pa] = []
-                grouped_batch[pa].append(opp)
+            grouped_batch: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for opp in opportunities_batch:
+                grouped_batch[opp.get('assigned_practice_area') or 'Uncategorized'].append(opp)
             
             sorted_practice_areas = sorted(grouped_batch.keys())
 
             for pa_idx, pa in enumerate(sorted_practice_areas):
-                lines.append(f"\n### {pa}")
-                sorted_opps = sorted(grouped_batch[pa], key=lambda x: x.get('fit_score_numeric', 0), reverse=True)
+                write(f"\n\n### {pa}")
+                sorted_opps = sorted(grouped_batch[pa], key=_fit_score_sort_key, reverse=True)
 
                 for opp_idx, opp in enumerate(sorted_opps):
                     if not first_item_in_report:
-                        lines.append("\n---\n")
+                        write("\n\n---\n")
                     else:
                         first_item_in_report = False
                     
-                    lines.append(f"\n#### {opp.get('title', 'N/A')}")
-                    lines.append(f"- **Notice ID:** {opp.get('notice_id', opp.get('noticeId', 'N/A'))}")
-                    lines.append(f"- **Department/Agency:** {opp.get('department', opp.get('agency', 'N/A'))}")
-                    lines.append(f"- **Posted Date:** {opp.get('posted_date', opp.get('postedDate', 'N/A'))}")
-                    lines.append(f"- **Response Date:** {opp.get('response_date', opp.get('responseDate', 'N/A'))}")
-                    lines.append(f"- **Set Aside:** {opp.get('set_aside', opp.get('setAside', 'N/A'))}")
-                    lines.append(f"- **Fit Score:** {opp.get('fit_score', 'N/A')}")
-                    lines.append(f"- **Justification:** {opp.get('justification', 'N/A')}")
-                    
-                    summary_desc_text = opp.get('summary_description', opp.get('summaryDescription', 'N/A'))
-                    lines.append(f"- **Summary Description:** {summary_desc_text if summary_desc_text else 'N/A'}")
-                    link_url = opp.get('link', opp.get('uiLink', '#'))
-                    link_text = opp.get('link', opp.get('uiLink', 'N/A'))
-                    lines.append(f"- **Link:** [{link_text}]({link_url})")
-
-        if unranked_opportunities_batch:
-            lines.append("\n## Unranked Opportunities")
-            for opp_idx, opp in enumerate(unranked_opportunities_batch):
+                    write("\n")
+                    write(_format_ranked_opportunity(opp))
+
+        elif kind == 'unranked':
+            write("\n## Unranked Opportunities")
+            for opp_idx, opp in enumerate(opportunities_batch):
                 # Logic to add HR if it's not the very first item in the entire message part
                 if not first_item_in_report: # An item (ranked or unranked) has already been printed
-                    lines.append("\n---\n")
+                    write("\n\n---\n")
                 else: # This is the first item overall in this part of the report
                     first_item_in_report = False
                 
-                lines.append(f"\n### {opp.get('title', 'N/A')}")
-                lines.append(f"- **Notice ID:** {opp.get('notice_id', opp.get('noticeId', 'N/A'))}")
-                lines.append(f"- **Department/Agency:** {opp.get('department', opp.get('agency', 'N/A'))}")
-                lines.append(f"- **Set Aside:** {opp.get('set_aside', opp.get('setAside', 'N/A'))}")
-                lines.append(f"- **Response Date:** {opp.get('response_date', opp.get('responseDate', 'N/A'))}")
-                link_url = opp.get('link', opp.get('uiLink', '#'))
-                link_text = opp.get('link', opp.get('uiLink', 'N/A'))
-                lines.append(f"- **Link:** [{link_text}]({link_url})")
-                lines.append(f"  - _This opportunity was not ranked due to limited information or other factors._")
-        
-        return "\n".join(lines)
+                write("\n")
+                write(_format_unranked_opportunity(opp))
+        else:
+            raise ValueError(f"Invalid batch kind: '{kind}'. Supported kinds are 'ranked' and 'unranked'.")
+
+        return buffer.getvalue()
+
+    def generate_html_report(self,
+                             ranked_opportunities: List[Dict[str, Any]],
+                             unranked_opportunities: List[Dict[str, Any]],
+                             generated_on_timestamp: Optional[str] = None) -> str:
+        """
+        Renders the HTML report from the opportunity_template.html Jinja2 template.
+
+        Raises:
+            RuntimeError: If jinja2 is not installed.
+        """
+        if _html_report_template is None:
+            raise RuntimeError("jinja2 is not installed. Install it to generate HTML reports.")
+        return _html_report_template.render(
+            ranked=ranked_opportunities,
+            unranked=unranked_opportunities,
+            generated_on=generated_on_timestamp or self._current_timestamp(),
+        )
+
+    def generate_markdown_report(self,
+                                 ranked_opportunities_batch: List[Dict[str, Any]],
+                                 unranked_opportunities_batch: List[Dict[str, Any]],
+                                 report_title_prefix: str = "Opportunity Analysis Report",
+                                 part_info: Optional[str] = None,
+                                 generated_on_timestamp: Optional[str] = None,
+                                 header: Optional[str] = None) -> str:
+        """
+        Renders a full markdown report: header, ranked section and unranked section.
+
+        A header already produced by render_header can be passed in to skip re-rendering it.
+        """
+        if header is None:
+            header = self.render_header(report_title_prefix, part_info, generated_on_timestamp)
+        sections = [
+            header,
+            self.render_batch(ranked_opportunities_batch, 'ranked'),
+            self.render_batch(unranked_opportunities_batch, 'unranked', first_item_in_report=not ranked_opportunities_batch),
+        ]
+        return "\n".join(section for section in sections if section)
 
 class OpportunityAnalyzer:
     """
     Orchestrates the BusinessDevelopmentAgent and ReportAgent to analyze opportunities.
     """
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, use_cache: bool = True, use_semantic_cache: bool = False,
+                 use_batch_api: bool = OPENAI_USE_BATCH_API) -> None:
         if not openai_api_key:
             # This should ideally be caught by the script calling this, 
             # but good to have a check.
@@ -478,12 +1265,55 @@ class OpportunityAnalyzer:
             raise ValueError("OpenAI API key is required for OpportunityAnalyzer.")
         
         # Default models are set in the respective agents' __init__ methods
-        self.business_dev_agent = BusinessDevelopmentAgent(api_key=openai_api_key)
+        self.business_dev_agent = BusinessDevelopmentAgent(
+            api_key=openai_api_key,
+            cache=LLMCache() if use_cache else None,
+            semantic_cache=SemanticCache() if use_semantic_cache else None,
+            use_batch_api=use_batch_api
+        )
         self.report_agent = ReportAgent(openai_api_key=openai_api_key)
 
         logger.info("OpportunityAnalyzer initialized with BusinessDevelopmentAgent and ReportAgent.")
 
     def analyze_opportunities(self, opportunities: List[Dict[str, Any]], output_format: str = "json") -> Union[Dict[str, Any], str]:
+        """
+        Synchronous wrapper around analyze_opportunities_async for callers without an event loop.
+        """
+        return self.business_dev_agent.run_sync(self.analyze_opportunities_async(opportunities, output_format))
+
+    def close(self) -> None:
+        """Releases the OpenAI connections held by the analyzer."""
+        self.business_dev_agent.close()
+
+    async def aclose(self) -> None:
+        """Releases the OpenAI connections the analyzer opened on the running event loop."""
+        await self.business_dev_agent.aclose()
+
+    @staticmethod
+    def _merge_ai_fields(enriched_opp: Dict[str, Any], ai_item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the AI-generated fields of a ranked item to its standardized opportunity, in place.
+
+        Fields like title, department, dates, set_aside and link are already in the standardized
+        opportunity. The AI returns them too, mostly for reference, but the standardized values are
+        kept; only the AI's summary_description is preferred, as it's crafted for output.
+
+        Args:
+            enriched_opp: The standardized opportunity to enrich.
+            ai_item: The AI's analysis of the opportunity.
+
+        Returns:
+            The enriched opportunity.
+        """
+        ai_field = ai_item.get
+        enriched_opp['assigned_practice_area'] = ai_field('assigned_practice_area')
+        enriched_opp['fit_score'] = ai_field('fit_score')
+        enriched_opp['justification'] = ai_field('justification')
+        # Keep the original summary if AI gave none; the key is always set so callers don't fall back to other fields
+        enriched_opp['summary_description'] = ai_field('summary_description') or enriched_opp.get('summary_description')
+        return enriched_opp
+
+    async def analyze_opportunities_async(self, opportunities: List[Dict[str, Any]], output_format: str = "json") -> Union[Dict[str, Any], str]:
         """
         Analyzes a list of opportunities and returns the result in the specified format.
 
@@ -499,9 +1329,12 @@ class OpportunityAnalyzer:
         """
         logger.info(f"Starting analysis for {len(opportunities)} opportunities. Output format: {output_format}")
         
+        # Standardize once; both the ranking input and the JSON output are built from these
+        standardized_opportunities = [self.business_dev_agent._standardize_opportunity(opp) for opp in opportunities]
+
         # Step 1: Get ranked and unranked data from BusinessDevelopmentAgent
         # This step involves API calls to OpenAI for ranking if rankable opportunities exist.
-        ranked_data_json = self.business_dev_agent.get_ranked_opportunities_json(opportunities)
+        ranked_data_json = await self.business_dev_agent.get_ranked_opportunities_json_async(opportunities, standardized_opportunities)
         
         # Step 2: Format the output
         if output_format.lower() == "markdown":
@@ -516,16 +1349,18 @@ class OpportunityAnalyzer:
         elif output_format.lower() == "json":
             logger.info("Preparing final JSON data with merged AI insights...")
 
+            # 0. Restore the original fields left out of the ranking input (placeOfPerformance, pointOfContact,
+            #    archiveDate, ...), so the JSON output keeps the full records. Standardized values win on clashes.
+            for original_opp, std_opp in zip(opportunities, standardized_opportunities):
+                for key, value in original_opp.items():
+                    std_opp.setdefault(key, value)
+
             # 1. Create a map of standardized versions of the original opportunities.
             #    The _standardize_opportunity method ensures fields like 'notice_id', 'department',
             #    'posted_date', 'response_date', 'set_aside', 'summary_description' (from original), 'link' are present.
-            standardized_opportunities_map = {}
-            for opp in opportunities:
-                std_opp = self.business_dev_agent._standardize_opportunity(opp.copy()) # Standardize a copy
-                notice_id = std_opp.get('notice_id') # _standardize_opportunity should create 'notice_id'
-                if notice_id: # Ensure notice_id exists after standardization
-                    standardized_opportunities_map[notice_id] = std_opp
-                else:
+            standardized_opportunities_map = {std_opp['notice_id']: std_opp for std_opp in standardized_opportunities if std_opp.get('notice_id')}
+            for std_opp in standardized_opportunities:
+                if not std_opp.get('notice_id'):
                     logger.warning(f"Opportunity missing notice_id after standardization, cannot be reliably merged: {std_opp.get('title', 'N/A')}")
 
             # 2. Get AI ranked data (this was already done)
@@ -534,41 +1369,27 @@ class OpportunityAnalyzer:
             # These items have: original_opportunity_id (internal batch id), title, notice_id, department, 
             # posted_date, response_date, set_aside, summary_description (AI version), 
             # assigned_practice_area, fit_score, justification, link.
-            ai_analyzed_items_map = {item['notice_id']: item for item in ranked_data_json.get("ranked_opportunities", []) if 'notice_id' in item}
-
-            final_enriched_opportunities = []
-            processed_notice_ids_for_final_list = set()
-
-            # 3. Merge AI data into the standardized opportunities
-            for notice_id, ai_item in ai_analyzed_items_map.items():
-                if notice_id in standardized_opportunities_map:
-                    # Start with the fully standardized opportunity
-                    enriched_opp = standardized_opportunities_map[notice_id].copy()
-                    
-                    # Add/overwrite with AI-generated fields
-                    enriched_opp['assigned_practice_area'] = ai_item.get('assigned_practice_area')
-                    enriched_opp['fit_score'] = ai_item.get('fit_score')
-                    enriched_opp['justification'] = ai_item.get('justification')
-                    # Use AI's summary_description as it's crafted for output
-                    enriched_opp['summary_description'] = ai_item.get('summary_description', enriched_opp.get('summary_description'))
-                    
-                    # Fields like title, department, dates, set_aside, link should already be in enriched_opp
-                    # from the initial standardization. The AI returns them too, mostly for reference or if the prompt
-                    # asked it to modify them. We are prioritizing the initially standardized values for these,
-                    # unless the AI's version is explicitly preferred (like summary_description).
+            ai_analyzed_items_map = {notice_id: item for item in ranked_data_json.get("ranked_opportunities", ())
+                                     if (notice_id := item.get('notice_id')) is not None}
 
-                    final_enriched_opportunities.append(enriched_opp)
-                    processed_notice_ids_for_final_list.add(notice_id)
-                else:
-                    logger.warning(f"AI analyzed item with notice_id '{notice_id}' not found in original standardized set. Skipping.")
+            # 3. Merge AI data into the standardized opportunities. Each standardized opportunity is built for
+            #    this call and not read again after the merge, so it is enriched in place rather than copied.
+            for notice_id in ai_analyzed_items_map.keys() - standardized_opportunities_map.keys():
+                logger.warning(f"AI analyzed item with notice_id '{notice_id}' not found in original standardized set. Skipping.")
+            final_enriched_opportunities = [
+                self._merge_ai_fields(std_opp, ai_item)
+                for notice_id, ai_item in ai_analyzed_items_map.items()
+                if (std_opp := standardized_opportunities_map.get(notice_id)) is not None
+            ]
 
             # 4. Add any standardized opportunities that were not analyzed by AI (e.g., unrankable by pre-filter)
-            for notice_id, std_opp in standardized_opportunities_map.items():
-                if notice_id not in processed_notice_ids_for_final_list:
-                    # This opportunity was standardized but not found in AI's ranked output.
-                    # It might be in ranked_data_json["unranked_opportunities"], or filtered before AI.
-                    # We add it here without AI fields to ensure it's in the final list if it was processed at all.
-                    final_enriched_opportunities.append(std_opp)
+            #    These were standardized but are not in AI's ranked output. They might be in
+            #    ranked_data_json["unranked_opportunities"], or filtered before AI. We add them without AI fields
+            #    to ensure they are in the final list if they were processed at all.
+            final_enriched_opportunities.extend(
+                std_opp for notice_id, std_opp in standardized_opportunities_map.items()
+                if notice_id not in ai_analyzed_items_map
+            )
             
             logger.info(f"Returning {len(final_enriched_opportunities)} merged and enriched opportunities in JSON format.")
             return {
@@ -0,0 +1,79 @@
+"""
+Cheap keyword prefilter for SAM.gov opportunities.
+
+Scores opportunities against the company practice areas by keyword overlap, so that only
+the most promising ones need their full descriptions fetched and analyzed with OpenAI.
+"""
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .config import PRACTICE_AREAS
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+_STOPWORDS = frozenset({
+    "about", "across", "after", "also", "along", "and", "based", "been", "being", "both",
+    "each", "ensure", "every", "federal", "from", "have", "help", "including", "include",
+    "into", "more", "most", "other", "over", "provide", "services", "such", "than", "that",
+    "their", "them", "these", "they", "this", "through", "using", "well", "were", "what",
+    "when", "which", "while", "will", "with", "within", "your",
+})
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercases text and returns its significant words, with a trailing plural 's' removed."""
+    words = []
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) <= 3 or word in _STOPWORDS:
+            continue
+        if word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def build_keyword_weights(practice_areas: Dict[str, str]) -> Dict[str, float]:
+    """
+    Build IDF-style keyword weights from the practice area names and descriptions.
+
+    Words that appear in fewer practice areas are more distinctive and get a higher weight.
+    """
+    area_terms = [set(_tokenize(f"{area} {description}")) for area, description in practice_areas.items()]
+    document_frequency = Counter(term for terms in area_terms for term in terms)
+    num_areas = len(area_terms)
+    return {term: math.log(1 + num_areas / count) for term, count in document_frequency.items()}
+
+
+_KEYWORD_WEIGHTS = build_keyword_weights(PRACTICE_AREAS)
+
+
+def score_cheap(opportunity: Dict[str, Any], practice_areas: Optional[Dict[str, str]] = None) -> float:
+    """
+    Score an opportunity's keyword overlap with the practice areas.
+
+    Only the title (and the description text, if it has already been fetched) is used,
+    so scoring needs no extra API calls.
+
+    Args:
+        opportunity: A raw SAM.gov opportunity.
+        practice_areas: Practice areas to score against. Defaults to the configured ones.
+
+    Returns:
+        The summed weight of the practice-area keywords found in the opportunity.
+    """
+    weights = _KEYWORD_WEIGHTS if practice_areas is None else build_keyword_weights(practice_areas)
+    return _score_with_weights(opportunity, weights)
+
+
+def _score_with_weights(opportunity: Dict[str, Any], weights: Dict[str, float]) -> float:
+    text = f"{opportunity.get('title') or ''} {opportunity.get('descriptionText') or ''}"
+    return sum(weights.get(term, 0.0) for term in set(_tokenize(text)))
+
+
+def top_k_opportunities(opportunities: List[Dict[str, Any]], k: int,
+                        practice_areas: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Returns the k opportunities with the highest keyword score, best first."""
+    weights = _KEYWORD_WEIGHTS if practice_areas is None else build_keyword_weights(practice_areas)
+    return sorted(opportunities, key=lambda opp: _score_with_weights(opp, weights), reverse=True)[:k]
@@ -3,14 +3,35 @@ SAM.gov API client module.
 
 This module provides functions to interact with the SAM.gov Get Opportunities Public API.
 """
+import json
+import os
 import requests
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 from urllib.parse import urlencode
 
+try:
+    import diskcache
+except ImportError:
+    diskcache = None # type: ignore
+
 from app.config import SAM_API_BASE_URL, SAM_API_KEY, DEFAULT_LIMIT, DEFAULT_OFFSET
 
+# Max pooled keep-alive connections per host; covers concurrent searches and description fetches
+HTTP_POOL_SIZE = 20
+
+# Description requests in flight at once; kept below HTTP_POOL_SIZE so each worker has a pooled connection
+DESCRIPTION_FETCH_WORKERS = 16
+
+# Where validators (ETag / Last-Modified) and bodies of previous search responses are kept
+DEFAULT_ETAG_CACHE_PATH = os.path.expanduser("~/.sam_etag_cache")
+# Searches default to a date window ending today, so their entries stop being requested within days
+ETAG_CACHE_TTL_SECONDS = 7 * 86400
+ETAG_CACHE_SIZE_LIMIT = 256 * 1024 * 1024 # Bytes; least recently stored entries are evicted beyond this
+
 
 class SAMApiError(Exception):
     """Exception raised for SAM.gov API errors."""
@@ -20,38 +41,66 @@ class SAMApiError(Exception):
 class SAMClient:
     """Client for interacting with the SAM.gov API."""
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 etag_cache_path: Optional[str] = None):
         """
         Initialize the SAM.gov API client.
         
         Args:
             api_key: The API key for SAM.gov. Defaults to the one in config.
             base_url: The base URL for the SAM.gov API. Defaults to the one in config.
+            etag_cache_path: Directory for conditional GET validators and cached responses. When set,
+                repeated searches send If-None-Match / If-Modified-Since, and a 304 response
+                is answered from the cache. Entries expire after ETAG_CACHE_TTL_SECONDS.
+                Disabled by default, and requires diskcache.
         """
         self.api_key = api_key or SAM_API_KEY
         self.base_url = base_url or SAM_API_BASE_URL
         
         if not self.api_key:
             raise ValueError("SAM.gov API key is required. Set it in .env file or pass it to the constructor.")
+
+        # Reuse connections across requests instead of paying a TCP+TLS handshake per call
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+
+        self.etag_cache_path = etag_cache_path
+        # Entries are written individually, so concurrent searches don't rewrite the whole cache
+        self._etag_cache = None
+        if etag_cache_path:
+            if diskcache is None:
+                print("diskcache is not installed. SAM.gov search responses will not be cached between runs.")
+            else:
+                self._etag_cache = diskcache.Cache(etag_cache_path, size_limit=ETAG_CACHE_SIZE_LIMIT)
+
+        # Descriptions already fetched by this client, keyed by notice ID
+        self._description_cache: Dict[str, str] = {}
+
+    def close(self) -> None:
+        """Closes the pooled HTTP connections and the response cache."""
+        self.session.close()
+        if self._etag_cache is not None:
+            self._etag_cache.close()
+
+    def __enter__(self) -> "SAMClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
     
-    def _build_url(self, endpoint: str, params: Dict[str, Any]) -> str:
-        """
-        Build the URL for the API request.
-        
-        Args:
-            endpoint: The API endpoint.
-            params: The query parameters.
-            
-        Returns:
-            The complete URL for the API request.
-        """
-        # Add API key to parameters
-        params['api_key'] = self.api_key
-        
-        # Build the URL
-        url = f"{self.base_url}{endpoint}?{urlencode(params, doseq=True)}"
-        return url
-    
+    def _store_etag_cache_entry(self, cache_key: str, response: requests.Response) -> None:
+        """Stores a response's validators and body, if it has any validators."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        entry = {'etag': etag, 'last_modified': last_modified, 'body': response.text}
+        try:
+            self._etag_cache.set(cache_key, entry, expire=ETAG_CACHE_TTL_SECONDS)
+        except OSError as e:
+            print(f"Could not write SAM.gov ETag cache {self.etag_cache_path}: {str(e)}")
+
     def _make_request(self, endpoint: str, params: Dict[str, Any], max_retries: int = 3, retry_delay: int = 5) -> Dict[str, Any]:
         """
         Make a request to the SAM.gov API with retry logic.
@@ -68,14 +117,31 @@ class SAMClient:
         Raises:
             SAMApiError: If the API returns an error after all retries.
         """
-        url = self._build_url(endpoint, params)
+        # Cache key excludes the API key, which is only added to the request parameters
+        cache_key = f"{endpoint}?{urlencode(sorted(params.items()), doseq=True)}" if self._etag_cache is not None else None
+        cached_entry = self._etag_cache.get(cache_key) if cache_key else None
+        headers = {}
+        if cached_entry:
+            if cached_entry.get('etag'):
+                headers['If-None-Match'] = cached_entry['etag']
+            if cached_entry.get('last_modified'):
+                headers['If-Modified-Since'] = cached_entry['last_modified']
+
+        url = f"{self.base_url}{endpoint}"
+        request_params = {**params, 'api_key': self.api_key}
         last_exception = None
 
         for attempt in range(max_retries):
             try:
-                response = requests.get(url, timeout=30)
+                response = self.session.get(url, params=request_params, headers=headers, timeout=30)
+                if response.status_code == 304 and cached_entry:
+                    # Unchanged since the last run; parse the stored body so callers get a fresh copy
+                    return json.loads(cached_entry['body'])
                 response.raise_for_status()
-                return response.json()
+                result = response.json()
+                if cache_key:
+                    self._store_etag_cache_entry(cache_key, response)
+                return result
             except requests.exceptions.HTTPError as e:
                 status_code = e.response.status_code
                 error_message = f"HTTP Error: {status_code}"
@@ -97,8 +163,8 @@ class SAMClient:
                     error_message = f"{error_message} - {e.response.text}"
                     is_suspended = 'SUSPENDED' in e.response.text
 
-                # Print the URL that caused the error (for debugging)
-                print(f"Error URL: {url}")
+                # Print the URL that caused the error (for debugging), without the API key
+                print(f"Error URL: {url}?{urlencode(params, doseq=True)}")
 
                 last_exception = SAMApiError(error_message)
 
@@ -165,7 +231,7 @@ class SAMClient:
             state: Place of performance state.
             zip_code: Place of performance ZIP code.
             set_aside_type: Type of set-aside code.
-            naics_code: NAICS code.
+            naics_code: NAICS code, or a list of codes sent as a single comma-separated value.
             classification_code: Classification code.
             posted_from: Posted from date (mm/dd/yyyy).
             posted_to: Posted to date (mm/dd/yyyy).
@@ -199,65 +265,102 @@ class SAMClient:
         if set_aside_type:
             params['typeOfSetAside'] = set_aside_type
         if naics_code:
-            # The SAM.gov API expects a single NAICS code as a string
+            # Multiple NAICS codes are sent as one comma-separated ncode value
+            if isinstance(naics_code, (list, tuple)):
+                naics_code = ",".join(naics_code)
             params['ncode'] = naics_code
         if classification_code:
             params['ccode'] = classification_code
             
         # Format date parameters
-        # SAM.gov API now requires postedFrom and postedTo parameters
-        if posted_from:
-            if isinstance(posted_from, datetime):
-                posted_from = posted_from.strftime('%m/%d/%Y')
-            params['postedFrom'] = posted_from
-        else:
-            # Default to 30 days ago
-            from datetime import timedelta
-            default_from = (datetime.now() - timedelta(days=30)).strftime('%m/%d/%Y')
-            params['postedFrom'] = default_from
-            
-        if posted_to:
-            if isinstance(posted_to, datetime):
-                posted_to = posted_to.strftime('%m/%d/%Y')
-            params['postedTo'] = posted_to
-        else:
-            # Default to today
-            default_to = datetime.now().strftime('%m/%d/%Y')
-            params['postedTo'] = default_to
-            
-        if response_deadline_from:
-            if isinstance(response_deadline_from, datetime):
-                response_deadline_from = response_deadline_from.strftime('%m/%d/%Y')
-            params['rdlfrom'] = response_deadline_from
-            
-        if response_deadline_to:
-            if isinstance(response_deadline_to, datetime):
-                response_deadline_to = response_deadline_to.strftime('%m/%d/%Y')
-            params['rdlto'] = response_deadline_to
+        # SAM.gov API now requires postedFrom and postedTo parameters, which default to the last 30 days.
+        # Read the clock once so both defaults come from the same moment
+        now = datetime.now()
+        date_params = (
+            ('postedFrom', posted_from, now - timedelta(days=30)),
+            ('postedTo', posted_to, now),
+            ('rdlfrom', response_deadline_from, None),
+            ('rdlto', response_deadline_to, None),
+        )
+        for param_name, value, default in date_params:
+            value = value or default
+            if not value:
+                continue
+            if isinstance(value, datetime):
+                value = value.strftime('%m/%d/%Y')
+            params[param_name] = value
         
         # Make the request
         result = self._make_request('', params)
         
         # If include_description is True, fetch the description for each opportunity
-        if include_description and result.get('opportunitiesData'):
-            opportunities = result.get('opportunitiesData', [])
-            for opportunity in opportunities:
+        if include_description and (opportunities := result.get('opportunitiesData')):
+            self.add_descriptions(opportunities)
+        
+        return result
+    
+    def add_descriptions(self, opportunities: List[Dict[str, Any]]) -> None:
+        """
+        Fetch the description text for each opportunity and store it in 'descriptionText'.
+
+        Descriptions are fetched concurrently over the pooled session.
+
+        Callers that filter or deduplicate search results should do so before calling this,
+        since each description is a separate API request.
+
+        Args:
+            opportunities: Opportunities from a search response, updated in place.
+        """
+        # Rows sharing a notice ID are fetched once, since concurrent workers would miss each other's cache entries
+        opportunities_by_notice_id: Dict[str, List[Dict[str, Any]]] = {}
+        for opportunity in opportunities:
+            notice_id = opportunity.get('noticeId')
+            if notice_id:
+                opportunities_by_notice_id.setdefault(notice_id, []).append(opportunity)
+        if not opportunities_by_notice_id:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(DESCRIPTION_FETCH_WORKERS, len(opportunities_by_notice_id))) as executor:
+            futures = {
+                executor.submit(self.get_opportunity_description, notice_id): notice_id
+                for notice_id in opportunities_by_notice_id
+            }
+            for future in as_completed(futures):
+                notice_id = futures[future]
                 try:
                     # Replace the description URL with the actual description text
-                    notice_id = opportunity.get('noticeId')
-                    if notice_id:
-                        description_text = self.get_opportunity_description(notice_id)
-                        opportunity['descriptionText'] = description_text
+                    description_text = future.result()
                 except Exception as e:
                     # If there's an error fetching the description, log it but continue
                     print(f"Error fetching description for {notice_id}: {str(e)}")
-                    opportunity['descriptionText'] = "Error fetching description"
-        
-        return result
+                    description_text = "Error fetching description"
+                for opportunity in opportunities_by_notice_id[notice_id]:
+                    opportunity['descriptionText'] = description_text
     
     def get_opportunity_description(self, notice_id: str, max_retries: int = 3, retry_delay: int = 5) -> str:
         """
-        Get the description for a specific opportunity by its notice ID with retry logic.
+        Get the description for a specific opportunity by its notice ID.
+
+        Descriptions are cached for the lifetime of the client, so an opportunity seen again
+        (e.g. by get_opportunity_by_id after a search) is not re-fetched. Failures are not cached.
+
+        Args:
+            notice_id: The notice ID of the opportunity.
+            max_retries: Maximum number of retry attempts (default: 3).
+            retry_delay: Initial delay between retries in seconds (default: 5).
+
+        Returns:
+            The description text for the opportunity.
+        """
+        description = self._description_cache.get(notice_id)
+        if description is None:
+            description = self._fetch_opportunity_description(notice_id, max_retries, retry_delay)
+            self._description_cache[notice_id] = description
+        return description
+
+    def _fetch_opportunity_description(self, notice_id: str, max_retries: int = 3, retry_delay: int = 5) -> str:
+        """
+        Fetch the description for a specific opportunity by its notice ID with retry logic.
 
         Args:
             notice_id: The notice ID of the opportunity.
@@ -269,13 +372,14 @@ class SAMClient:
         """
         # The description URL is in the format:
         # https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid={notice_id}
-        description_url = f"https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid={notice_id}&api_key={self.api_key}"
+        description_url = "https://api.sam.gov/prod/opportunities/v1/noticedesc"
+        params = {'noticeid': notice_id, 'api_key': self.api_key}
 
         last_exception = None
 
         for attempt in range(max_retries):
             try:
-                response = requests.get(description_url, timeout=30)
+                response = self.session.get(description_url, params=params, timeout=30)
                 response.raise_for_status()
                 data = response.json()
 
@@ -352,18 +456,7 @@ class SAMClient:
         """
         result = self.search_opportunities(notice_id=notice_id, limit=1)
         
-        if include_description and result.get('opportunitiesData'):
-            opportunities = result.get('opportunitiesData', [])
-            for opportunity in opportunities:
-                try:
-                    # Replace the description URL with the actual description text
-                    notice_id = opportunity.get('noticeId')
-                    if notice_id:
-                        description_text = self.get_opportunity_description(notice_id)
-                        opportunity['descriptionText'] = description_text
-                except Exception as e:
-                    # If there's an error fetching the description, log it but continue
-                    print(f"Error fetching description for {notice_id}: {str(e)}")
-                    opportunity['descriptionText'] = "Error fetching description"
+        if include_description and (opportunities := result.get('opportunitiesData')):
+            self.add_descriptions(opportunities)
         
         return result
@@ -0,0 +1,156 @@
+"""
+Embedding-based cache for OpenAI analyses of near-duplicate opportunities.
+
+SAM.gov often reposts an opportunity with small changes (amendments, re-solicitations),
+which the exact-match LLMCache misses. This cache embeds each opportunity's title and the
+start of its description, and reuses a previous analysis when a stored opportunity with
+the same NAICS code is similar enough.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from array import array
+from operator import mul
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None # type: ignore
+
+from .config import PRACTICE_AREAS
+from .llm_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEMANTIC_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "semantic")
+DEFAULT_SIMILARITY_THRESHOLD = 0.97
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DESCRIPTION_CHARS = 2000 # Only the start of the description is embedded
+DEFAULT_MAX_ENTRIES = 5000 # Bounds the linear scan; the oldest entries are evicted first
+
+
+class SemanticCache:
+    """
+    On-disk store of (embedding, NAICS code, scope, analysis) entries, searched by cosine similarity.
+
+    Vectors are normalized when stored, so similarity is a dot product. The store is searched
+    with a linear scan, so it is bounded: entries expire after the TTL and the oldest are evicted
+    beyond max_entries. The scope ties an entry to the model, prompt and practice areas that
+    produced it, and entries from another scope are never reused.
+    """
+
+    def __init__(self, directory: str = DEFAULT_SEMANTIC_CACHE_DIR,
+                 threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                 ttl: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache and load its stored entries.
+
+        Args:
+            directory: Directory holding the cache files.
+            threshold: Minimum cosine similarity for a stored analysis to be reused.
+            ttl: Time-to-live for stored entries, in seconds.
+            max_entries: Maximum number of stored entries.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+        # notice ID -> (vector, NAICS code, scope, analysis), oldest first
+        self._entries: Dict[str, Tuple[array, str, str, Dict[str, Any]]] = {}
+
+        if diskcache is None:
+            logger.warning("diskcache is not installed. The semantic analysis cache is disabled.")
+            self._cache = None
+            return
+
+        self._cache = diskcache.Cache(directory)
+        self._cache.expire()
+        stored = []
+        for key in self._cache.iterkeys():
+            entry = self._cache.get(key)
+            if entry is not None:
+                stored.append((entry.get("stored_at", 0), key, entry))
+        stored.sort(key=lambda item: item[0])
+        num_evicted = max(len(stored) - self.max_entries, 0)
+        for _, key, _ in stored[:num_evicted]:
+            self._cache.delete(key)
+        for _, key, entry in stored[num_evicted:]:
+            self._entries[key] = (entry["vector"], entry["naics"], entry.get("scope", ""), entry["analysis"])
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache is not None
+
+    @staticmethod
+    def make_scope(model: str, prompt_version: str) -> str:
+        """
+        Build the scope of the analyses made with a model and prompt version.
+
+        Like LLMCache keys, the scope also covers the practice areas, so changing them
+        invalidates stored analyses.
+        """
+        payload = json.dumps({
+            "model": model,
+            "prompt": prompt_version,
+            "areas": sorted(PRACTICE_AREAS.items()),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def embedding_text(title: str, description: str) -> str:
+        """Returns the text embedded for an opportunity."""
+        return f"{title}\n{description[:EMBEDDING_DESCRIPTION_CHARS]}"
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> array:
+        norm = math.sqrt(sum(map(mul, vector, vector))) or 1.0
+        return array('f', (value / norm for value in vector))
+
+    def lookup(self, vector: Sequence[float], naics: str, scope: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the analysis of the most similar stored opportunity with the same NAICS code
+        and scope, or None if none reaches the similarity threshold.
+        """
+        query = self._normalize(vector)
+        best_similarity, best_analysis = self.threshold, None
+        for stored_vector, stored_naics, stored_scope, analysis in list(self._entries.values()):
+            if stored_naics != naics or stored_scope != scope:
+                continue
+            similarity = sum(map(mul, query, stored_vector))
+            if similarity >= best_similarity:
+                best_similarity, best_analysis = similarity, analysis
+
+        self.stats["hits" if best_analysis is not None else "misses"] += 1
+        return best_analysis
+
+    def lookup_many(self, queries: Sequence[Tuple[Sequence[float], str]], scope: str) -> List[Optional[Dict[str, Any]]]:
+        """
+        Looks up several (vector, NAICS code) pairs in one call.
+
+        The scan is CPU-bound, so async callers should run this in a worker thread.
+        """
+        return [self.lookup(vector, naics, scope) for vector, naics in queries]
+
+    def add(self, notice_id: str, vector: Sequence[float], naics: str, scope: str,
+            analysis: Dict[str, Any]) -> None:
+        """Stores the analysis for an opportunity, replacing any earlier one for the same notice ID."""
+        if self._cache is None:
+            return
+        normalized = self._normalize(vector)
+        self._cache.set(notice_id, {
+            "vector": normalized,
+            "naics": naics,
+            "scope": scope,
+            "analysis": analysis,
+            "stored_at": time.time(),
+        }, expire=self.ttl)
+        self._entries.pop(notice_id, None) # Re-inserted as the newest entry
+        self._entries[notice_id] = (normalized, naics, scope, analysis)
+        while len(self._entries) > self.max_entries:
+            oldest_notice_id = next(iter(self._entries))
+            del self._entries[oldest_notice_id]
+            self._cache.delete(oldest_notice_id)
@@ -50,24 +50,24 @@ PRACTICE_AREAS = {
 }
 
 # NAICS codes for company capabilities
-COMPANY_NAICS_CODES = [
-    "519190", "518210", "541430", "541490", "541511", "541512", "541519", 
-    "541611", "541618", "541690", "541990", "92119", "921190", "541715", 
-    "611430", "561110", "541990"
-]
+COMPANY_NAICS_CODES = (
+    "519190", "518210", "541430", "541490", "541511", "541512", "541519",
+    "541611", "541618", "541690", "541990", "92119", "921190", "541715",
+    "611430", "561110",
+)
 
 # Procurement types of interest
-PROCUREMENT_TYPES = ["p", "r", "o", "k"]
+PROCUREMENT_TYPES = ("p", "r", "o", "k")
 
 # Preferred agencies that should receive higher scoring weights
-PREFERRED_AGENCIES = [
+PREFERRED_AGENCIES = (
     "Department of Agriculture",
     "Department of Transportation",
     "Department of Veterans Affairs",
     "Department of Education",
     "Department of Interior",
-    "Department of Homeland Security"
-]
+    "Department of Homeland Security",
+)
 
 # Validate essential configurations
 if not OPENAI_API_KEY:
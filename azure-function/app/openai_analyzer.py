@@ -484,6 +484,30 @@ class OpportunityAnalyzer:
 
         logger.info("OpportunityAnalyzer initialized with BusinessDevelopmentAgent and ReportAgent.")
 
+    @staticmethod
+    def _merge_ai_fields(enriched_opp: Dict[str, Any], ai_item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the AI-generated fields of a ranked item to its standardized opportunity, in place.
+
+        Fields like title, department, dates, set_aside and link are already in the standardized
+        opportunity. The AI returns them too, mostly for reference, but the standardized values are
+        kept; only the AI's summary_description is preferred, as it's crafted for output.
+
+        Args:
+            enriched_opp: The standardized opportunity to enrich.
+            ai_item: The AI's analysis of the opportunity.
+
+        Returns:
+            The enriched opportunity.
+        """
+        ai_field = ai_item.get
+        enriched_opp['assigned_practice_area'] = ai_field('assigned_practice_area')
+        enriched_opp['fit_score'] = ai_field('fit_score')
+        enriched_opp['justification'] = ai_field('justification')
+        # Keep the original summary if AI gave none; the key is always set so callers don't fall back to other fields
+        enriched_opp['summary_description'] = ai_field('summary_description') or enriched_opp.get('summary_description')
+        return enriched_opp
+
     def analyze_opportunities(self, opportunities: List[Dict[str, Any]], output_format: str = "json") -> Union[Dict[str, Any], str]:
         """
         Analyzes a list of opportunities and returns the result in the specified format.
@@ -520,13 +544,11 @@ class OpportunityAnalyzer:
             # 1. Create a map of standardized versions of the original opportunities.
             #    The _standardize_opportunity method ensures fields like 'notice_id', 'department',
             #    'posted_date', 'response_date', 'set_aside', 'summary_description' (from original), 'link' are present.
-            standardized_opportunities_map = {}
-            for opp in opportunities:
-                std_opp = self.business_dev_agent._standardize_opportunity(opp.copy()) # Standardize a copy
-                notice_id = std_opp.get('notice_id') # _standardize_opportunity should create 'notice_id'
-                if notice_id: # Ensure notice_id exists after standardization
-                    standardized_opportunities_map[notice_id] = std_opp
-                else:
+            #    _standardize_opportunity works on its own copy, so the originals are not copied here.
+            standardized_opportunities = [self.business_dev_agent._standardize_opportunity(opp) for opp in opportunities]
+            standardized_opportunities_map = {std_opp['notice_id']: std_opp for std_opp in standardized_opportunities if std_opp.get('notice_id')}
+            for std_opp in standardized_opportunities:
+                if not std_opp.get('notice_id'):
                     logger.warning(f"Opportunity missing notice_id after standardization, cannot be reliably merged: {std_opp.get('title', 'N/A')}")
 
             # 2. Get AI ranked data (this was already done)
@@ -535,41 +557,27 @@ class OpportunityAnalyzer:
             # These items have: original_opportunity_id (internal batch id), title, notice_id, department, 
             # posted_date, response_date, set_aside, summary_description (AI version), 
             # assigned_practice_area, fit_score, justification, link.
-            ai_analyzed_items_map = {item['notice_id']: item for item in ranked_data_json.get("ranked_opportunities", []) if 'notice_id' in item}
-
-            final_enriched_opportunities = []
-            processed_notice_ids_for_final_list = set()
-
-            # 3. Merge AI data into the standardized opportunities
-            for notice_id, ai_item in ai_analyzed_items_map.items():
-                if notice_id in standardized_opportunities_map:
-                    # Start with the fully standardized opportunity
-                    enriched_opp = standardized_opportunities_map[notice_id].copy()
-                    
-                    # Add/overwrite with AI-generated fields
-                    enriched_opp['assigned_practice_area'] = ai_item.get('assigned_practice_area')
-                    enriched_opp['fit_score'] = ai_item.get('fit_score')
-                    enriched_opp['justification'] = ai_item.get('justification')
-                    # Use AI's summary_description as it's crafted for output
-                    enriched_opp['summary_description'] = ai_item.get('summary_description', enriched_opp.get('summary_description'))
-                    
-                    # Fields like title, department, dates, set_aside, link should already be in enriched_opp
-                    # from the initial standardization. The AI returns them too, mostly for reference or if the prompt
-                    # asked it to modify them. We are prioritizing the initially standardized values for these,
-                    # unless the AI's version is explicitly preferred (like summary_description).
-
-                    final_enriched_opportunities.append(enriched_opp)
-                    processed_notice_ids_for_final_list.add(notice_id)
-                else:
-                    logger.warning(f"AI analyzed item with notice_id '{notice_id}' not found in original standardized set. Skipping.")
+            ai_analyzed_items_map = {notice_id: item for item in ranked_data_json.get("ranked_opportunities", ())
+                                     if (notice_id := item.get('notice_id')) is not None}
+
+            # 3. Merge AI data into the standardized opportunities. Each standardized opportunity is built for
+            #    this call and not read again after the merge, so it is enriched in place rather than copied.
+            for notice_id in ai_analyzed_items_map.keys() - standardized_opportunities_map.keys():
+                logger.warning(f"AI analyzed item with notice_id '{notice_id}' not found in original standardized set. Skipping.")
+            final_enriched_opportunities = [
+                self._merge_ai_fields(std_opp, ai_item)
+                for notice_id, ai_item in ai_analyzed_items_map.items()
+                if (std_opp := standardized_opportunities_map.get(notice_id)) is not None
+            ]
 
             # 4. Add any standardized opportunities that were not analyzed by AI (e.g., unrankable by pre-filter)
-            for notice_id, std_opp in standardized_opportunities_map.items():
-                if notice_id not in processed_notice_ids_for_final_list:
-                    # This opportunity was standardized but not found in AI's ranked output.
-                    # It might be in ranked_data_json["unranked_opportunities"], or filtered before AI.
-                    # We add it here without AI fields to ensure it's in the final list if it was processed at all.
-                    final_enriched_opportunities.append(std_opp)
+            #    These were standardized but are not in AI's ranked output. They might be in
+            #    ranked_data_json["unranked_opportunities"], or filtered before AI. We add them without AI fields
+            #    to ensure they are in the final list if they were processed at all.
+            final_enriched_opportunities.extend(
+                std_opp for notice_id, std_opp in standardized_opportunities_map.items()
+                if notice_id not in ai_analyzed_items_map
+            )
             
             logger.info(f"Returning {len(final_enriched_opportunities)} merged and enriched opportunities in JSON format.")
             return {
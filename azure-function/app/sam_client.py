@@ -4,12 +4,20 @@ SAM.gov API client module.
 This module provides functions to interact with the SAM.gov Get Opportunities Public API.
 """
 import requests
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 from urllib.parse import urlencode
 
 from app.config import SAM_API_BASE_URL, SAM_API_KEY, DEFAULT_LIMIT, DEFAULT_OFFSET
 
+# Max pooled keep-alive connections per host; covers concurrent searches and description fetches
+HTTP_POOL_SIZE = 20
+
+# Description requests in flight at once; kept below HTTP_POOL_SIZE so each worker has a pooled connection
+DESCRIPTION_FETCH_WORKERS = 16
+
 
 class SAMApiError(Exception):
     """Exception raised for SAM.gov API errors."""
@@ -32,24 +40,23 @@ class SAMClient:
         
         if not self.api_key:
             raise ValueError("SAM.gov API key is required. Set it in .env file or pass it to the constructor.")
-    
-    def _build_url(self, endpoint: str, params: Dict[str, Any]) -> str:
-        """
-        Build the URL for the API request.
-        
-        Args:
-            endpoint: The API endpoint.
-            params: The query parameters.
-            
-        Returns:
-            The complete URL for the API request.
-        """
-        # Add API key to parameters
-        params['api_key'] = self.api_key
-        
-        # Build the URL
-        url = f"{self.base_url}{endpoint}?{urlencode(params, doseq=True)}"
-        return url
+
+        # Reuse connections across requests instead of paying a TCP+TLS handshake per call
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+
+        # Descriptions already fetched by this client, keyed by notice ID
+        self._description_cache: Dict[str, str] = {}
+
+    def close(self) -> None:
+        """Closes the pooled HTTP connections."""
+        self.session.close()
+
+    def __enter__(self) -> "SAMClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
     
     def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -65,10 +72,10 @@ class SAMClient:
         Raises:
             SAMApiError: If the API returns an error.
         """
-        url = self._build_url(endpoint, params)
+        url = f"{self.base_url}{endpoint}"
         
         try:
-            response = requests.get(url)
+            response = self.session.get(url, params={**params, 'api_key': self.api_key}, timeout=30)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
@@ -87,8 +94,8 @@ class SAMClient:
                 # If we can't parse JSON, try to get the text content
                 error_message = f"{error_message} - {e.response.text}"
             
-            # Print the URL that caused the error (for debugging)
-            print(f"Error URL: {url}")
+            # Print the URL that caused the error (for debugging), without the API key
+            print(f"Error URL: {url}?{urlencode(params, doseq=True)}")
             
             raise SAMApiError(error_message) from e
         except requests.exceptions.RequestException as e:
@@ -164,59 +171,89 @@ class SAMClient:
             params['ccode'] = classification_code
             
         # Format date parameters
-        # SAM.gov API now requires postedFrom and postedTo parameters
-        if posted_from:
-            if isinstance(posted_from, datetime):
-                posted_from = posted_from.strftime('%m/%d/%Y')
-            params['postedFrom'] = posted_from
-        else:
-            # Default to 30 days ago
-            from datetime import timedelta
-            default_from = (datetime.now() - timedelta(days=30)).strftime('%m/%d/%Y')
-            params['postedFrom'] = default_from
-            
-        if posted_to:
-            if isinstance(posted_to, datetime):
-                posted_to = posted_to.strftime('%m/%d/%Y')
-            params['postedTo'] = posted_to
-        else:
-            # Default to today
-            default_to = datetime.now().strftime('%m/%d/%Y')
-            params['postedTo'] = default_to
-            
-        if response_deadline_from:
-            if isinstance(response_deadline_from, datetime):
-                response_deadline_from = response_deadline_from.strftime('%m/%d/%Y')
-            params['rdlfrom'] = response_deadline_from
-            
-        if response_deadline_to:
-            if isinstance(response_deadline_to, datetime):
-                response_deadline_to = response_deadline_to.strftime('%m/%d/%Y')
-            params['rdlto'] = response_deadline_to
+        # SAM.gov API now requires postedFrom and postedTo parameters, which default to the last 30 days.
+        # Read the clock once so both defaults come from the same moment
+        now = datetime.now()
+        date_params = (
+            ('postedFrom', posted_from, now - timedelta(days=30)),
+            ('postedTo', posted_to, now),
+            ('rdlfrom', response_deadline_from, None),
+            ('rdlto', response_deadline_to, None),
+        )
+        for param_name, value, default in date_params:
+            value = value or default
+            if not value:
+                continue
+            if isinstance(value, datetime):
+                value = value.strftime('%m/%d/%Y')
+            params[param_name] = value
         
         # Make the request
         result = self._make_request('', params)
         
         # If include_description is True, fetch the description for each opportunity
-        if include_description and result.get('opportunitiesData'):
-            opportunities = result.get('opportunitiesData', [])
-            for opportunity in opportunities:
+        if include_description and (opportunities := result.get('opportunitiesData')):
+            self.add_descriptions(opportunities)
+        
+        return result
+    
+    def add_descriptions(self, opportunities: List[Dict[str, Any]]) -> None:
+        """
+        Fetch the description text for each opportunity and store it in 'descriptionText'.
+
+        Descriptions are fetched concurrently over the pooled session.
+
+        Args:
+            opportunities: Opportunities from a search response, updated in place.
+        """
+        # Rows sharing a notice ID are fetched once, since concurrent workers would miss each other's cache entries
+        opportunities_by_notice_id: Dict[str, List[Dict[str, Any]]] = {}
+        for opportunity in opportunities:
+            notice_id = opportunity.get('noticeId')
+            if notice_id:
+                opportunities_by_notice_id.setdefault(notice_id, []).append(opportunity)
+        if not opportunities_by_notice_id:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(DESCRIPTION_FETCH_WORKERS, len(opportunities_by_notice_id))) as executor:
+            futures = {
+                executor.submit(self.get_opportunity_description, notice_id): notice_id
+                for notice_id in opportunities_by_notice_id
+            }
+            for future in as_completed(futures):
+                notice_id = futures[future]
                 try:
                     # Replace the description URL with the actual description text
-                    notice_id = opportunity.get('noticeId')
-                    if notice_id:
-                        description_text = self.get_opportunity_description(notice_id)
-                        opportunity['descriptionText'] = description_text
+                    description_text = future.result()
                 except Exception as e:
                     # If there's an error fetching the description, log it but continue
                     print(f"Error fetching description for {notice_id}: {str(e)}")
-                    opportunity['descriptionText'] = "Error fetching description"
-        
-        return result
+                    description_text = "Error fetching description"
+                for opportunity in opportunities_by_notice_id[notice_id]:
+                    opportunity['descriptionText'] = description_text
     
     def get_opportunity_description(self, notice_id: str) -> str:
         """
         Get the description for a specific opportunity by its notice ID.
+
+        Descriptions are cached for the lifetime of the client, so an opportunity seen again
+        (e.g. by get_opportunity_by_id after a search) is not re-fetched. Failures are not cached.
+
+        Args:
+            notice_id: The notice ID of the opportunity.
+
+        Returns:
+            The description text for the opportunity.
+        """
+        description = self._description_cache.get(notice_id)
+        if description is None:
+            description = self._fetch_opportunity_description(notice_id)
+            self._description_cache[notice_id] = description
+        return description
+
+    def _fetch_opportunity_description(self, notice_id: str) -> str:
+        """
+        Fetch the description for a specific opportunity by its notice ID.
         
         Args:
             notice_id: The notice ID of the opportunity.
@@ -226,14 +263,15 @@ class SAMClient:
         """
         # The description URL is in the format:
         # https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid={notice_id}
-        description_url = f"https://api.sam.gov/prod/opportunities/v1/noticedesc?noticeid={notice_id}"
+        description_url = "https://api.sam.gov/prod/opportunities/v1/noticedesc"
         
         params = {
+            'noticeid': notice_id,
             'api_key': self.api_key
         }
         
         try:
-            response = requests.get(f"{description_url}&api_key={self.api_key}")
+            response = self.session.get(description_url, params=params, timeout=30)
             response.raise_for_status()
             data = response.json()
             
@@ -272,18 +310,7 @@ class SAMClient:
         """
         result = self.search_opportunities(notice_id=notice_id, limit=1)
         
-        if include_description and result.get('opportunitiesData'):
-            opportunities = result.get('opportunitiesData', [])
-            for opportunity in opportunities:
-                try:
-                    # Replace the description URL with the actual description text
-                    notice_id = opportunity.get('noticeId')
-                    if notice_id:
-                        description_text = self.get_opportunity_description(notice_id)
-                        opportunity['descriptionText'] = description_text
-                except Exception as e:
-                    # If there's an error fetching the description, log it but continue
-                    print(f"Error fetching description for {notice_id}: {str(e)}")
-                    opportunity['descriptionText'] = "Error fetching description"
+        if include_description and (opportunities := result.get('opportunitiesData')):
+            self.add_descriptions(opportunities)
         
         return result
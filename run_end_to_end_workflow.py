@@ -514,6 +514,14 @@ Return JSON format:
 
         logger.info(f"  Fetching contracts for {len(stored_matches)} matches...")
 
+        # Fetch contracts for all matches concurrently from GovWin API
+        govwin_opp_ids = [
+            match.get('govwin_opportunity', {}).get('govwin_id')
+            for match in stored_matches
+            if match.get('govwin_opportunity', {}).get('govwin_id')
+        ]
+        contracts_by_opp_id = self.govwin_client.get_opportunities_contracts(govwin_opp_ids)
+
         for match in stored_matches:
             try:
                 # Get the GovWin opportunity ID from the match
@@ -521,8 +529,7 @@ Return JSON format:
                 if not govwin_opp_id:
                     continue
 
-                # Fetch contracts from GovWin API
-                contracts_data = self.govwin_client.get_opportunity_contracts(govwin_opp_id)
+                contracts_data = contracts_by_opp_id.get(govwin_opp_id)
 
                 if not contracts_data:
                     logger.info(f"    No contracts found for {govwin_opp_id}")
@@ -23,7 +23,11 @@ logger = logging.getLogger(__name__)
 
 BACKEND_API_URL = os.getenv('BACKEND_API_URL', 'http://localhost:8000')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-BATCH_SIZE = 3  # Process 3 opportunities at a time (reduced to save tokens and processing time)
+BATCH_SIZE = 25  # Process 25 opportunities at a time (one OpenAI request per batch, sharing the system prompt)
+# Per-batch analysis timeout: the 5-minute OpenAI request timeout plus time for generating each opportunity's
+# analysis. 20 seconds per opportunity is several times the typical generation time, and with 3 opportunities
+# per batch this gives the original 6 minutes.
+BATCH_ANALYSIS_TIMEOUT = 300 + 20 * BATCH_SIZE
 
 # Retry configuration for backend API
 MAX_RETRIES = 5
@@ -127,8 +131,10 @@ def transform_opportunity_for_analyzer(opp):
     """
     Transform API response format to the format expected by the analyzer.
     The analyzer expects SAM.gov API format (camelCase), but our API returns snake_case.
-    Note: _standardize_opportunity does opportunity.copy() which preserves original fields,
-    so we need to provide the camelCase SAM.gov format here.
+    Note: _standardize_opportunity reads only the SAM.gov fields in
+    BusinessDevelopmentAgent.PASSTHROUGH_FIELDS, so we need to provide the camelCase SAM.gov
+    format here. Other keys, including _db_id/_db_notice_id, are not used for ranking; the
+    JSON output carries them over, but results are mapped back to database IDs by notice ID.
     """
     return {
         # SAM.gov API format (camelCase) - required by the analyzer
@@ -171,11 +177,11 @@ def analyze_batch(analyzer, batch):
         import signal
 
         def timeout_handler(signum, frame):
-            raise TimeoutError("Batch analysis timed out after 6 minutes")
+            raise TimeoutError(f"Batch analysis timed out after {BATCH_ANALYSIS_TIMEOUT} seconds")
 
-        # Set a 6-minute timeout (slightly longer than OpenAI's 5-minute timeout)
+        # Set a timeout longer than OpenAI's 5-minute timeout, scaled with the batch size
         signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(360)  # 6 minutes
+        signal.alarm(BATCH_ANALYSIS_TIMEOUT)
 
         try:
             result = analyzer.analyze_opportunities(transformed_batch, output_format="json")
@@ -255,8 +261,9 @@ def main():
         return
 
     try:
-        # Initialize analyzer
-        analyzer = OpportunityAnalyzer(openai_api_key=OPENAI_API_KEY)
+        # Initialize analyzer. Batch API jobs can take hours, far beyond the per-batch alarm below,
+        # so this job always ranks synchronously whatever OPENAI_USE_BATCH_API says.
+        analyzer = OpportunityAnalyzer(openai_api_key=OPENAI_API_KEY, use_batch_api=False)
 
         # Fetch unscored opportunities (fit_score = 0 or NULL)
         logger.info("Fetching unscored opportunities from backend...")